@@ -0,0 +1,95 @@
+""" Sparse set covering kernel for the Halloween challenge.
+
+    The instance is a CSR array whose rows are the sets and whose columns are the points.
+    The coverage of a state is one sparse product: count[p] = number of selected sets covering p.
+    A hill climber that keeps count only needs the row of the flipped set to score a tweak.
+"""
+from itertools import product
+from random import Random
+
+import numpy as np
+from scipy import sparse
+
+
+def make_set_covering_problem(num_points: int, num_sets: int, density: float, seed: int | None = None) -> sparse.csr_array:
+    """
+        Returns a sparse array where rows are sets and columns are the covered items, generated straight in CSR:
+        the random cells are drawn in one call and every point gets one more random set, so the problem is solvable.
+    """
+    if seed is None:
+        seed = int(num_points * 2654435761 + num_sets + density * 1_000)
+    rng = np.random.default_rng(seed)
+    cells = sparse.random(num_sets, num_points, density=density, format="coo", random_state=rng)
+    rows = np.concatenate([cells.row, rng.integers(0, num_sets, size=num_points)])
+    cols = np.concatenate([cells.col, np.arange(num_points)])
+    # duplicated cells are summed, astype(bool) turns them back into a single True
+    sets = sparse.csr_array((np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(num_sets, num_points))
+    return sets.astype(bool)
+
+
+class Halloween:
+    """ Fitness of a Halloween instance, calls counts the fitness evaluations like the CALLS global of the notebook. """
+
+    def __init__(self, sets) -> None:
+        self.sets = sparse.csr_array(sets, dtype=np.int32)
+        self.sets.sum_duplicates()
+        self.num_sets, self.num_points = self.sets.shape
+        self.calls = 0
+
+    def counts(self, state: np.ndarray) -> np.ndarray:
+        """ Returns how many selected sets cover every point, a single sparse row-sum over the selected sets. """
+        return self.sets.T @ np.asarray(state, dtype=np.int32)
+
+    def fitness(self, state: np.ndarray) -> tuple[int, int]:
+        """ Returns (number of covered points, -number of selected sets). """
+        self.calls += 1
+        return int(np.count_nonzero(self.counts(state))), -int(np.count_nonzero(state))
+
+    def points(self, idx: int) -> np.ndarray:
+        """ Returns the points covered by the set idx. """
+        return self.sets.indices[self.sets.indptr[idx]:self.sets.indptr[idx + 1]]
+
+    def delta(self, state: np.ndarray, counts: np.ndarray, idx: int) -> tuple[int, int]:
+        """
+            Returns the change of fitness if the set idx is flipped, in O(|set|):
+            adding it covers the points nobody covers, removing it uncovers the points only it covers.
+        """
+        self.calls += 1
+        points = counts[self.points(idx)]
+        if state[idx]:
+            return -int(np.count_nonzero(points == 1)), 1
+        return int(np.count_nonzero(points == 0)), -1
+
+    def flip(self, state: np.ndarray, counts: np.ndarray, idx: int) -> None:
+        """ Flips the set idx in place, counts included. """
+        counts[self.points(idx)] += -1 if state[idx] else 1
+        state[idx] = not state[idx]
+
+
+def hill_climbing(problem: Halloween, max_iterations: int, seed: int | None = None) -> tuple[np.ndarray, tuple[int, int]]:
+    """
+        The hill climber of the notebook, but a tweak is scored with delta instead of two full fitness calls.
+        Returns the final state and its fitness.
+    """
+    rng = Random(seed)
+    state = np.zeros(problem.num_sets, dtype=bool)
+    counts = problem.counts(state)
+    fitness = problem.fitness(state)
+    for _ in range(max_iterations):
+        idx = rng.randint(0, problem.num_sets - 1)
+        valid, cost = problem.delta(state, counts, idx)
+        if (valid, cost) >= (0, 0):
+            problem.flip(state, counts, idx)
+            fitness = fitness[0] + valid, fitness[1] + cost
+    return state, fitness
+
+
+def challenge(num_points=(100, 1_000, 5_000), num_sets=(100, 1_000, 5_000), density=(.3, .7),
+              max_iterations: int = 10_000) -> dict:
+    """ Runs hill_climbing on every (num_points, num_sets, density) configuration, returns their fitness and calls. """
+    results = dict()
+    for configuration in product(num_points, num_sets, density):
+        problem = Halloween(make_set_covering_problem(*configuration))
+        _, fitness = hill_climbing(problem, max_iterations, seed=0)
+        results[configuration] = fitness, problem.calls
+    return results
@@ -2,8 +2,11 @@ import logging
 import random
 import numpy as np
 import pprint as pp
+from bisect import bisect_right
 from collections import namedtuple
-from copy import deepcopy
+from functools import reduce
+from itertools import accumulate
+from operator import xor
 
 Nimply = namedtuple("Nimply", "row num_objects")
 
@@ -42,27 +45,54 @@ def gabriele(state: Nim) -> Nimply:
     return Nimply(*max(possible_moves, key=lambda m: (-m[0], m[1])))
 
 def nim_sum(state: Nim) -> int:
-    tmp = np.array([tuple(int(x) for x in f"{c:032b}") for c in state.rows])
-    xor = tmp.sum(axis=0) % 2
-    return int("".join(str(_) for _ in xor), base=2)
+    """XOR of the rows"""
+    return reduce(xor, state.rows, 0)
+
+def nim_sum_after(state: Nim, ply: Nimply, current: int = None) -> int:
+    """Nim sum after ply, without copying the state: only one row changes, so its old value is XORed out"""
+    if current is None:
+        current = nim_sum(state)
+    row = state.rows[ply.row]
+    return current ^ row ^ (row - ply.num_objects)
+
+def winning_moves(state: Nim) -> list:
+    """The moves leaving a nim sum of 0: a row can be reduced to row ^ nim_sum only if that is smaller"""
+    current = nim_sum(state)
+    if current == 0:
+        return []
+    return [Nimply(r, c - (c ^ current)) for r, c in enumerate(state.rows) if c ^ current < c]
+
+def score_plies(state: Nim) -> np.ndarray:
+    """Nim sum after every ply at once: element [r, o - 1] is the nim sum after taking o objects from row r, -1 if not possible"""
+    rows = np.array(state.rows, dtype=np.int64)
+    after = rows[:, None] - np.arange(1, max(rows.max(initial=0), 1) + 1)
+    return np.where(after >= 0, nim_sum(state) ^ rows[:, None] ^ after, -1)
 
 def analize(raw: Nim) -> dict:
     cooked = dict()
     cooked["possible_moves"] = dict()
+    current = nim_sum(raw)
     for ply in (Nimply(r, o) for r, c in enumerate(raw.rows) for o in range(1, c + 1)):
-        tmp = deepcopy(raw)
-        tmp.nimming(ply)
-        cooked["possible_moves"][ply] = nim_sum(tmp)
+        cooked["possible_moves"][ply] = nim_sum_after(raw, ply, current)
     return cooked
 
 def optimal(state: Nim) -> Nimply:
-    analysis = analize(state)
-    logging.debug(f"analysis:\n{pp.pformat(analysis)}")
-    spicy_moves = [ply for ply, ns in analysis["possible_moves"].items() if ns != 0]
-    if not spicy_moves:
-        spicy_moves = list(analysis["possible_moves"].keys())
-    ply = random.choice(spicy_moves)
-    return ply
+    """
+    A random ply among the ones leaving a nonzero nim sum, all the others are the winning moves.
+    The ply is drawn uniformly among all the plies until it is not a winning move, instead of listing them all.
+    """
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        logging.debug(f"analysis:\n{pp.pformat(analize(state))}")
+    winning = winning_moves(state)
+    bounds = list(accumulate(state.rows))
+    if len(winning) == bounds[-1]:
+        return random.choice(winning)
+    while True:
+        idx = random.randrange(bounds[-1])
+        row = bisect_right(bounds, idx)
+        ply = Nimply(row, bounds[row] - idx)
+        if ply not in winning:
+            return ply
 
 def tournament_selection(population, tournament_size):
     tournament = random.sample(population, tournament_size)
@@ -85,11 +115,9 @@ def evolutionary_strategy(state, generations, population_size, tournament_size,
         mutated_population = [mutate(move, mutation_rate, population) for move in population]
         selected_population = [tournament_selection(mutated_population, tournament_size) for _ in range(population_size)]
 
+        current = nim_sum(state)
         for move in selected_population:
-            tmp_state = deepcopy(state)
-            tmp_state.nimming(move)
-            score = nim_sum(tmp_state)
-            
+            score = nim_sum_after(state, move, current)
 
             if score > best_score:
                 best_score = score
@@ -0,0 +1,99 @@
+from collections import OrderedDict
+
+import numpy as np
+
+
+class CachedProblem:
+    """Bounded LRU memoization around a lab9_lib problem, keyed on the packed bits of the genome"""
+
+    def __init__(self, problem, maxsize=100_000):
+        self.problem = problem
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def calls(self):
+        return self.problem.calls
+
+    @staticmethod
+    def key(genome):
+        genome = np.asarray(genome) != 0
+        return len(genome), np.packbits(genome).tobytes()
+
+    def _store(self, key, fitness):
+        self._cache[key] = fitness
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+    def _lookup(self, key):
+        fitness = self._cache.get(key)
+        if fitness is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._cache.move_to_end(key)
+        return fitness
+
+    def __call__(self, genome):
+        key = CachedProblem.key(genome)
+        fitness = self._lookup(key)
+        if fitness is None:
+            fitness = self.problem(genome)
+            self._store(key, fitness)
+        return fitness
+
+    def batch(self, genomes):
+        """Fitness of every row of an (N, L) array, the rows not cached are scored with one problem.batch call"""
+        genomes = np.atleast_2d(np.asarray(genomes))
+        keys = [CachedProblem.key(genome) for genome in genomes]
+        fitnesses = []
+        # key -> row of the first occurrence of the genomes not cached, a repeated genome is scored once
+        missing = {}
+        for i, key in enumerate(keys):
+            if key in missing:
+                # scored by the first occurrence, so a hit like any cached genome
+                self.hits += 1
+                fitnesses.append(None)
+                continue
+            fitness = self._lookup(key)
+            if fitness is None:
+                missing[key] = i
+            fitnesses.append(fitness)
+        if missing:
+            scored = self.problem.batch(genomes[list(missing.values())]).tolist()
+            missing = dict(zip(missing, scored))
+            for key, fitness in missing.items():
+                self._store(key, fitness)
+        return [fitness if fitness is not None else missing[key] for key, fitness in zip(keys, fitnesses)]
+
+    def stats(self):
+        return f"fitness calls: {self.calls}, cache hits: {self.hits}, cache misses: {self.misses}"
+
+
+class Population:
+    """Individuals with their fitness, each individual is scored once when it is added"""
+
+    def __init__(self, fitness_function, individuals=()):
+        self.fitness_function = fitness_function
+        self.individuals = []
+        self.fitnesses = []
+        for individual in individuals:
+            self.add(individual)
+
+    def __len__(self):
+        return len(self.individuals)
+
+    def add(self, individual):
+        self.individuals.append(individual)
+        self.fitnesses.append(self.fitness_function(individual))
+
+    def best(self):
+        i = max(range(len(self)), key=self.fitnesses.__getitem__)
+        return self.individuals[i], self.fitnesses[i]
+
+    def remove_worst(self):
+        i = min(range(len(self)), key=self.fitnesses.__getitem__)
+        self.fitnesses.pop(i)
+        return self.individuals.pop(i)
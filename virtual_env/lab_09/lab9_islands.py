@@ -0,0 +1,120 @@
+import itertools
+import multiprocessing as mp
+import queue
+from collections import namedtuple
+
+import numpy as np
+
+import lab9_lib
+
+Config = namedtuple(
+    "Config",
+    [
+        "genome_length",  # loci of a genome
+        "population_size",  # individuals kept by every island
+        "offspring_size",  # children generated by every island at each generation
+        "mutation_rate",  # probability of flipping each locus of a child
+        "num_generations",  # generations of every island, None to stop only on the budget
+        "migration_interval",  # generations between two migrations
+        "num_migrants",  # elites sent to the next island at each migration
+        "budget",  # fitness calls of all the islands of an instance, summed
+    ],
+    defaults=[1000, 50, 50, 0.001, 1000, 10, 2, 100_000],
+)
+
+
+def reserve(calls, budget, n):
+    """Adds n to the shared calls counter, unless that exceeds the budget"""
+    with calls.get_lock():
+        if calls.value + n > budget:
+            return False
+        calls.value += n
+        return True
+
+
+def evolve(a, island, config, seed, inbox, outbox, calls, stop, results):
+    """(mu + lambda) EA of one island, elites go to outbox every migration_interval generations, immigrants replace the worst"""
+    problem = lab9_lib.make_problem(a)
+    rng = np.random.default_rng(seed)
+    if inbox is not None:
+        inbox.cancel_join_thread()
+    if outbox is not None:
+        outbox.cancel_join_thread()
+
+    if not reserve(calls, config.budget, config.population_size):
+        results.put((a, island, None, 0.0, problem.calls))
+        return
+    population = rng.integers(0, 2, size=(config.population_size, config.genome_length), dtype=np.uint8)
+    fitnesses = problem.batch(population)
+
+    generations = itertools.count(1) if config.num_generations is None else range(1, config.num_generations + 1)
+    for generation in generations:
+        if stop.is_set() or not reserve(calls, config.budget, config.offspring_size):
+            break
+        # binary tournaments, then uniform crossover and bit-flip mutation
+        pairs = rng.integers(0, config.population_size, size=(2, config.offspring_size, 2))
+        parents = np.where(fitnesses[pairs[..., 0]] >= fitnesses[pairs[..., 1]], pairs[..., 0], pairs[..., 1])
+        mask = rng.random((config.offspring_size, config.genome_length)) < 0.5
+        offspring = np.where(mask, population[parents[0]], population[parents[1]])
+        offspring ^= (rng.random(offspring.shape) < config.mutation_rate).astype(np.uint8)
+
+        population = np.vstack([population, offspring])
+        fitnesses = np.concatenate([fitnesses, problem.batch(offspring)])
+        survivors = np.argsort(-fitnesses, kind="stable")[: config.population_size]
+        population, fitnesses = population[survivors], fitnesses[survivors]
+        if fitnesses[0] >= 1:
+            stop.set()
+            break
+
+        if outbox is not None and generation % config.migration_interval == 0:
+            outbox.put((population[: config.num_migrants].copy(), fitnesses[: config.num_migrants].copy()))
+        while inbox is not None:
+            try:
+                migrants, migrant_fitnesses = inbox.get_nowait()
+            except queue.Empty:
+                break
+            population[-len(migrants) :] = migrants
+            fitnesses[-len(migrants) :] = migrant_fitnesses
+            order = np.argsort(-fitnesses, kind="stable")
+            population, fitnesses = population[order], fitnesses[order]
+
+    results.put((a, island, population[0], float(fitnesses[0]), problem.calls))
+
+
+def run(problem_sizes=(1, 2, 5, 10), num_islands=4, config=Config(), seed=42):
+    """
+    Runs num_islands islands for every make_problem(a) instance, all of them concurrently in separate processes.
+    The islands of an instance form a ring and share its budget of fitness calls.
+    num_islands=1 is the single-population baseline, compare it with num_generations=None so that every run
+    spends the whole budget whatever the number of islands.
+    Returns, for every instance, the best genome, its fitness and the fitness calls summed across islands.
+    """
+    results = mp.Queue()
+    processes = []
+    for a in problem_sizes:
+        calls = mp.Value("l", 0)
+        stop = mp.Event()
+        inboxes = [mp.Queue() for _ in range(num_islands)] if num_islands > 1 else [None]
+        for island in range(num_islands):
+            args = (a, island, config, (seed, a, island), inboxes[island], inboxes[(island + 1) % num_islands], calls, stop, results)
+            processes.append(mp.Process(target=evolve, args=args))
+    for process in processes:
+        process.start()
+
+    summary = {a: {"genome": None, "fitness": 0.0, "calls": 0} for a in problem_sizes}
+    for _ in processes:
+        a, _, genome, fitness, island_calls = results.get()
+        summary[a]["calls"] += island_calls
+        if genome is not None and (summary[a]["genome"] is None or fitness > summary[a]["fitness"]):
+            summary[a].update(genome=genome, fitness=fitness)
+    for process in processes:
+        process.join()
+    return summary
+
+
+if __name__ == "__main__":
+    # same cost for both: the islands evolve until the budget is spent
+    config = Config(num_generations=None)
+    for num_islands in (1, 4):
+        for a, result in run(num_islands=num_islands, config=config).items():
+            print(f"problem {a}, {num_islands} island(s): fitness {result['fitness']:.2%}, fitness calls {result['calls']}")
@@ -0,0 +1,66 @@
+""" Single-state local search for set covering, the problem of set-covering_SingleState.ipynb.
+
+    The state is a boolean array over the sets and the search keeps, for every element, the number of taken
+    sets covering it (see halloween.Halloween). Flipping a set updates that count in O(|set|) and the fitness
+    (covered elements, -taken sets) is updated with the delta, never recomputed.
+"""
+from math import exp
+from random import Random
+
+import numpy as np
+
+from halloween import Halloween
+
+MODES = ('steepest', 'first', 'annealing')
+
+
+def score(delta: tuple[int, int]) -> int:
+    """ Scalar with the same order as the (covered, -cost) deltas: the cost only breaks ties on coverage. """
+    return 3 * delta[0] + delta[1]
+
+
+def neighbours(problem: Halloween, state: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """ Returns score(delta) of flipping every set, two sparse products instead of one delta per set. """
+    gains = problem.sets @ (counts == 0).astype(np.int32)
+    losses = problem.sets @ (counts == 1).astype(np.int32)
+    problem.calls += problem.num_sets
+    return np.where(state, score((-1, 0)) * losses + 1, score((1, 0)) * gains - 1)
+
+
+def local_search(problem: Halloween, steps: int, mode: str = 'first', seed: int | None = None,
+                 temperature: float = 1.0, cooling: float = 0.999) -> tuple[np.ndarray, tuple[int, int]]:
+    """
+        Runs steps steps of local search from the empty selection, problem can be built from any
+        (NUM_SETS, PROBLEM_SIZE) matrix, dense or sparse.
+        mode 'steepest' flips the best set and stops in a local optimum, 'first' flips a random set if it
+        does not worsen the fitness, 'annealing' also accepts a worse one with probability exp(score / temperature),
+        the temperature being multiplied by cooling at every step.
+        Returns the best state found and its fitness.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode {mode!r}, expected one of {MODES}")
+    rng = Random(seed)
+    state = np.zeros(problem.num_sets, dtype=bool)
+    counts = problem.counts(state)
+    fitness = problem.fitness(state)
+    best_state, best_fitness = state.copy(), fitness
+
+    for _ in range(steps):
+        if mode == 'steepest':
+            scores = neighbours(problem, state, counts)
+            idx = int(np.argmax(scores))
+            if scores[idx] <= 0:
+                break
+            delta = problem.delta(state, counts, idx)
+        else:
+            idx = rng.randrange(problem.num_sets)
+            delta = problem.delta(state, counts, idx)
+            temperature *= cooling
+            if delta < (0, 0) and not (mode == 'annealing' and temperature > 0
+                                       and rng.random() < exp(score(delta) / temperature)):
+                continue
+        problem.flip(state, counts, idx)
+        fitness = fitness[0] + delta[0], fitness[1] + delta[1]
+        if fitness > best_fitness:
+            best_state, best_fitness = state.copy(), fitness
+    return best_state, best_fitness
@@ -0,0 +1,190 @@
+""" Benchmarks of the Quixo engines and players.
+
+    python benchmark.py                                 print the report
+    python benchmark.py --output report.json            also save it
+    python benchmark.py --baseline before.json          compare with a stored report, exits with 1 on regressions
+    python benchmark.py --baseline before.json --relative
+                                                        compare only the ratios, which do not depend on the host
+
+    python benchmark.py --baseline benchmark_baseline.json --relative
+                                                        compare with the committed ratios
+
+    Every metric is the median of --repeat runs of the whole suite.
+    The absolute rates depend on the machine: a baseline of them must be generated on the same machine
+    (python benchmark.py --output before.json before the change).
+    The *_ratio metrics compare engines and table sizes within one run and can be compared across hosts,
+    benchmark_baseline.json keeps only them.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import numpy as np
+from game import Game, Move
+from bitboard import BitboardGame
+from player.genetic_player import GeneticPlayer
+from player.random_player import RandomPlayer
+from player.qlearn_player import QLearningPlayer
+from utils import verifie_move, simulate_move, fitness
+
+SEED = 42
+# metrics where a smaller value is better, for the others a larger value is better
+LOWER_IS_BETTER = ("latency", "seconds", "growth")
+
+
+def games_per_second(game_class: type[Game], num_games: int) -> float:
+    """ Random against random games played per second. """
+    random.seed(SEED)
+    start = time.perf_counter()
+    for _ in range(num_games):
+        game_class().play(RandomPlayer(), RandomPlayer())
+    return num_games / (time.perf_counter() - start)
+
+
+def sample_positions(num_positions: int) -> list[Game]:
+    """ Positions reached by random play, with the player to move set. """
+    random.seed(SEED)
+    positions = []
+    while len(positions) < num_positions:
+        game = Game()
+        game.current_player_idx = 0
+        for _ in range(random.randint(0, 30)):
+            game.apply(random.choice(game.legal_moves()))
+            if game.check_winner() >= 0:
+                break
+        else:
+            positions.append(game)
+    return positions
+
+
+def calls_per_second(function, positions: list[Game], repeat: int) -> float:
+    """ Calls per second of function(from_pos, slide, game) over all the positions and moves. """
+    moves = [((x, y), slide) for x in range(5) for y in range(5) for slide in Move]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for game in positions:
+            for from_pos, slide in moves:
+                function(from_pos, slide, game)
+    return repeat * len(positions) * len(moves) / (time.perf_counter() - start)
+
+
+def genetic_latency(positions: list[Game]) -> dict[str, float]:
+    """ Percentiles of GeneticPlayer.make_move latency, in milliseconds. """
+    random.seed(SEED)
+    player = GeneticPlayer()
+    latencies = []
+    for game in positions:
+        start = time.perf_counter()
+        player.make_move(game)
+        latencies.append((time.perf_counter() - start) * 1000)
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    return {"genetic_make_move_latency_p50_ms": p50, "genetic_make_move_latency_p90_ms": p90, "genetic_make_move_latency_p99_ms": p99}
+
+
+def q_update_seconds(table_sizes: list[int], num_games: int, passes: int = 10) -> dict[str, float]:
+    """
+        Time of QLearningPlayer.update_q_table on the same games, with a q-table already holding table_size states,
+        the fastest of passes passes over the games.
+    """
+    random.seed(SEED)
+    recorder = QLearningPlayer(exploration_prob=1)
+    games = []
+    for _ in range(num_games):
+        game = BitboardGame()
+        winner = game.play(recorder, RandomPlayer())
+        games.append((recorder.history, 10 if winner == 0 else -1, game))
+        recorder.history = []
+
+    results = {}
+    rng = np.random.default_rng(SEED)
+    for size in table_sizes:
+        player = QLearningPlayer(table_size=None)
+        for key, value in zip(rng.integers(1 << 50, size=size).tolist(), rng.normal(size=size).tolist()):
+            player.q_table.put(key, 0, value)
+        # best of passes: one pass is a few milliseconds, too short for a stable single measurement
+        best = float("inf")
+        for _ in range(passes):
+            start = time.perf_counter()
+            for history, reward, game in games:
+                player.history = list(history)
+                player.update_q_table(reward, game)
+            best = min(best, time.perf_counter() - start)
+        results[f"q_update_seconds_table_{size}"] = best / num_games
+    return results
+
+
+def measure(scale: int) -> dict[str, float]:
+    """ Runs all the benchmarks once. """
+    metrics = {
+        "game_random_games_per_second": games_per_second(Game, 50 * scale),
+        "bitboard_random_games_per_second": games_per_second(BitboardGame, 50 * scale),
+    }
+    positions = sample_positions(20 * scale)
+    for function in (verifie_move, simulate_move, fitness):
+        metrics[f"{function.__name__}_calls_per_second"] = calls_per_second(function, positions, 1)
+    metrics.update(genetic_latency(positions))
+    metrics.update(q_update_seconds([1_000, 10_000, 100_000], 10 * scale))
+    # relative metrics, host independent
+    metrics["bitboard_speedup_ratio"] = metrics["bitboard_random_games_per_second"] / metrics["game_random_games_per_second"]
+    metrics["q_update_growth_ratio"] = metrics["q_update_seconds_table_100000"] / metrics["q_update_seconds_table_1000"]
+    return metrics
+
+
+def run(quick: bool = False, repeat: int = 5) -> dict[str, float]:
+    """ Median of every metric over repeat runs of all the benchmarks, quick runs are smaller (and noisier). """
+    reports = [measure(1 if quick else 10) for _ in range(repeat)]
+    return {name: float(np.median([report[name] for report in reports])) for name in reports[0]}
+
+
+def compare(report: dict[str, float], baseline: dict[str, float], tolerance: float, relative: bool = False) -> list[str]:
+    """
+        Returns the metrics that are worse than the baseline by more than tolerance (a fraction).
+        If relative is True, only the *_ratio metrics are compared.
+    """
+    regressions = []
+    for name, base in baseline.items():
+        if name not in report or (relative and not name.endswith("_ratio")):
+            continue
+        value = report[name]
+        if any(word in name for word in LOWER_IS_BETTER):
+            worse = value > base * (1 + tolerance)
+        else:
+            worse = value < base * (1 - tolerance)
+        if worse:
+            regressions.append(f"{name}: {value:.4g} (baseline {base:.4g})")
+    return regressions
+
+
+def main():
+    """ Main function. """
+    parser = argparse.ArgumentParser(description="Quixo engine and players benchmarks")
+    parser.add_argument("--output", help="save the report to this json file")
+    parser.add_argument("--baseline", help="compare the report with this json file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, as a fraction of the baseline")
+    parser.add_argument("--quick", action="store_true", help="smaller, noisier runs")
+    parser.add_argument("--repeat", type=int, default=5, help="runs of every benchmark, the median is reported")
+    parser.add_argument("--relative", action="store_true",
+                        help="compare only the host independent ratios, for a baseline from another machine")
+    args = parser.parse_args()
+
+    report = run(args.quick, args.repeat)
+    for name, value in report.items():
+        print(f"{name}: {value:.4g}")
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=4)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(report, baseline, args.tolerance, args.relative)
+        if regressions:
+            print("---- Regressions ----")
+            print("\n".join(regressions))
+            sys.exit(1)
+        print("---- No regressions ----")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+from typing import TYPE_CHECKING
+import numpy as np
+from game import BORDER_MOVES, LINES, MOVE_INDEX, MOVE_LINES, Game, Move, Player
+
+if TYPE_CHECKING:
+    from instrumentation import PlayStats
+
+# Cell (row, col) of the board is stored in bit row * 5 + col of a 25-bit integer.
+# Each player owns one mask, a cell set in neither of them is neutral.
+
+FULL_MASK = (1 << 25) - 1
+CELL_BITS = 1 << np.arange(25, dtype=np.int64)
+
+
+def _bit(row: int, col: int) -> int:
+    """ Returns the mask of a single cell. """
+    return 1 << (row * 5 + col)
+
+
+def _line(cells) -> int:
+    """ Returns the mask of a set of cells. """
+    mask = 0
+    for row, col in cells:
+        mask |= _bit(row, col)
+    return mask
+
+
+# one mask for each line of the board, in the same order as LINES
+WIN_MASKS = tuple(_line(divmod(int(cell), 5) for cell in line) for line in LINES)
+
+
+def _slide_entry(row: int, col: int, slide: Move) -> tuple[int, int, int, int, int, int]:
+    """
+        Precomputes a slide as bit operations.
+        The cells between the taken piece and the destination border (segment) are shifted by one
+        towards the taken piece, then the piece is placed on the destination border.
+        Returns (from bit, keep mask, source mask, left shift, right shift, destination bit)
+    """
+    if slide == Move.LEFT:
+        segment = [(row, i) for i in range(0, col + 1)]
+        dest, shift = (row, 0), 1
+    elif slide == Move.RIGHT:
+        segment = [(row, i) for i in range(col, 5)]
+        dest, shift = (row, 4), -1
+    elif slide == Move.TOP:
+        segment = [(i, col) for i in range(0, row + 1)]
+        dest, shift = (0, col), 5
+    else:
+        segment = [(i, col) for i in range(row, 5)]
+        dest, shift = (4, col), -5
+    source = _line(segment) & ~_bit(row, col)
+    keep = FULL_MASK & ~_line(segment)
+    return _bit(row, col), keep, source, max(shift, 0), max(-shift, 0), _bit(*dest)
+
+
+# (X, Y) position + slide -> precomputed slide, only for the border moves
+SLIDE_TABLE: dict[tuple, tuple[int, int, int, int, int, int]] = {
+    (from_pos, slide): _slide_entry(from_pos[1], from_pos[0], slide)
+    for from_pos, slide in BORDER_MOVES
+}
+# masks of the lines that can change with each border move
+MOVE_WIN_MASKS = [tuple(WIN_MASKS[line] for line in lines) for lines in MOVE_LINES]
+# (bit of a border cell, border moves taking it), in BORDER_MOVES order: legal_moves only tests the 16 border cells
+CELL_MOVES = tuple(
+    (bit, tuple(move for move in BORDER_MOVES if SLIDE_TABLE[move][0] == bit))
+    for bit in dict.fromkeys(SLIDE_TABLE[move][0] for move in BORDER_MOVES)
+)
+
+
+def _to_board(masks: list[int]) -> np.ndarray:
+    """ Builds the read-only (5, 5) board of a pair of masks. """
+    board = np.full(25, -1, dtype=np.int16)
+    board[(masks[0] & CELL_BITS) != 0] = 0
+    board[(masks[1] & CELL_BITS) != 0] = 1
+    board.flags.writeable = False
+    return board.reshape((5, 5))
+
+
+class BitboardGame(Game):
+    """
+        Quixo engine backed by two 25-bit masks, one for each player.
+        Slides and win checks are done with precomputed masks, it plays exactly like Game
+        and players see the same board through get_board.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        # the board lives in the masks, the array inherited from Game is dropped so that it cannot be read stale
+        self._board = None
+        self._masks = [0, 0]
+
+    def get_board(self) -> np.ndarray:
+        '''
+        Returns a read-only snapshot of the board.
+        The snapshot is built once and shared until the board changes, copy it if you need to modify it
+        '''
+        if self._board_view is None:
+            self._board_view = _to_board(self._masks)
+        return self._board_view
+
+    def legal_moves(self) -> list[tuple[tuple[int, int], Move]]:
+        '''
+        Returns the moves the current player can play: the border moves whose piece is not owned by the opponent
+        '''
+        opponent = self._masks[1 - self.current_player_idx]
+        return [move for bit, moves in CELL_MOVES if not opponent & bit for move in moves]
+
+    def print(self):
+        '''Prints the board. -1 are neutral pieces, 0 are pieces of player 0, 1 pieces of player 1'''
+        print(self.get_board())
+
+    def check_winner(self) -> int:
+        '''Check the winner. Returns the player ID of the winner if any, otherwise returns -1'''
+        return self.__check_lines(WIN_MASKS)
+
+    def __check_lines(self, lines: tuple[int, ...]) -> int:
+        '''
+        Check the winner looking only at the given line masks.
+        If both players have completed a line, the player that made the last move loses (same rule as Game)
+        '''
+        player_0, player_1 = self._masks
+        wins_0 = any(player_0 & line == line for line in lines)
+        wins_1 = any(player_1 & line == line for line in lines)
+        if wins_0 and wins_1:
+            return 1 - self._last_player
+        if wins_0:
+            return 0
+        if wins_1:
+            return 1
+        return -1
+
+    def play(self, player1: Player, player2: Player, stats: 'PlayStats | None' = None) -> int:
+        '''Play the game. Returns the winning player. If stats is given, the game is recorded in it'''
+        if stats is not None:
+            return self._play_instrumented(player1, player2, stats)
+        players = [player1, player2]
+        winner = -1
+        while winner < 0:
+            self.current_player_idx += 1
+            self.current_player_idx %= len(players)
+            from_pos, slide = players[self.current_player_idx].make_move(self)
+            while not self.__move(from_pos, slide, self.current_player_idx):
+                from_pos, slide = players[self.current_player_idx].make_move(self)
+            # only the lines crossed by the move can have been completed
+            winner = self.__check_lines(MOVE_WIN_MASKS[MOVE_INDEX[(tuple(from_pos), slide)]])
+        return winner
+
+    def _try_move(self, from_pos: tuple[int, int], slide: Move, player_id: int) -> bool:
+        '''Perform a move, returns False if it is not acceptable'''
+        return self.__move(from_pos, slide, player_id)
+
+    def _move_winner(self, from_pos: tuple[int, int], slide: Move) -> int:
+        '''Returns the winner after the move just played, checking only the lines it crossed'''
+        return self.__check_lines(MOVE_WIN_MASKS[MOVE_INDEX[(tuple(from_pos), slide)]])
+
+    def apply(self, move: tuple[tuple[int, int], Move]) -> bool:
+        '''
+        Play a move for the current player, then pass the turn to the other player.
+        Returns False, leaving the game untouched, if the move is not acceptable.
+        Every applied move can be taken back with undo
+        '''
+        masks, last_player = list(self._masks), self._last_player
+        if not self.__move(move[0], move[1], self.current_player_idx):
+            return False
+        self._undo_stack.append((masks, self.current_player_idx, last_player))
+        self.current_player_idx = 1 - self.current_player_idx
+        return True
+
+    def undo(self) -> None:
+        '''Take back the last move played with apply'''
+        self._masks, self.current_player_idx, self._last_player = self._undo_stack.pop()
+        self._board_view = None
+
+    def next_state(self, move: tuple[tuple[int, int], Move]) -> np.ndarray | None:
+        '''
+        Returns the read-only board after the current player plays the move, the game is not modified.
+        Returns None if the move is not acceptable
+        '''
+        entry = SLIDE_TABLE.get((tuple(move[0]), move[1]))
+        if entry is None or self._masks[1 - self.current_player_idx] & entry[0]:
+            return None
+        return _to_board(self.__slide(entry, self.current_player_idx))
+
+    def __move(self, from_pos: tuple[int, int], slide: Move, player_id: int) -> bool:
+        '''Perform a move'''
+        entry = SLIDE_TABLE.get((tuple(from_pos), slide))
+        if entry is None or player_id > 1:
+            return False
+        # the piece can be taken only if it is neutral or it belongs to the player
+        if self._masks[1 - player_id] & entry[0]:
+            return False
+        self._masks = self.__slide(entry, player_id)
+        self._last_player = player_id
+        self._board_view = None
+        return True
+
+    def __slide(self, entry: tuple[int, int, int, int, int, int], player_id: int) -> list[int]:
+        '''Returns the masks after the slide described by the entry of SLIDE_TABLE'''
+        _, keep, source, left, right, dest = entry
+        masks = [(mask & keep) | (((mask & source) << left) >> right) for mask in self._masks]
+        masks[player_id] |= dest
+        masks[1 - player_id] &= ~dest
+        return masks
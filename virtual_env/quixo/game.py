@@ -1,8 +1,12 @@
 from abc import ABC, abstractmethod
-from copy import deepcopy
 from enum import Enum
+from time import perf_counter
+from typing import TYPE_CHECKING
 import numpy as np
 
+if TYPE_CHECKING:
+    from instrumentation import PlayStats
+
 # Rules on PDF
 
 
@@ -16,6 +20,82 @@ class Move(Enum):
     RIGHT = 3
 
 
+def _acceptable_slides(row: int, col: int) -> list[Move]:
+    '''A piece can be pushed back in from any side except the border it was taken from'''
+    slides = []
+    if row != 0:
+        slides.append(Move.TOP)
+    if row != 4:
+        slides.append(Move.BOTTOM)
+    if col != 0:
+        slides.append(Move.LEFT)
+    if col != 4:
+        slides.append(Move.RIGHT)
+    return slides
+
+
+# The 44 moves allowed by the rules, positions are in the (X, Y) format
+BORDER_MOVES: tuple[tuple[tuple[int, int], Move], ...] = tuple(
+    ((col, row), slide)
+    for row in range(5)
+    for col in range(5)
+    if row in (0, 4) or col in (0, 4)
+    for slide in _acceptable_slides(row, col)
+)
+# board coordinates of the piece taken by each move
+BORDER_ROWS = np.array([from_pos[1] for from_pos, _ in BORDER_MOVES])
+BORDER_COLS = np.array([from_pos[0] for from_pos, _ in BORDER_MOVES])
+# position of each move in BORDER_MOVES, looked up with (tuple(from_pos), slide) since players may return lists
+MOVE_INDEX: dict[tuple, int] = {move: idx for idx, move in enumerate(BORDER_MOVES)}
+
+
+def _slide_gather(row: int, col: int, slide: Move) -> tuple[list[int], int]:
+    '''
+    Describes a slide on the flattened board: after the slide, cell k holds what was in cell gather[k].
+    The taken piece is then placed in the returned destination cell
+    '''
+    gather = list(range(25))
+    if slide == Move.LEFT:
+        for i in range(col, 0, -1):
+            gather[row * 5 + i] = row * 5 + i - 1
+        dest = row * 5
+    elif slide == Move.RIGHT:
+        for i in range(col, 4):
+            gather[row * 5 + i] = row * 5 + i + 1
+        dest = row * 5 + 4
+    elif slide == Move.TOP:
+        for i in range(row, 0, -1):
+            gather[i * 5 + col] = (i - 1) * 5 + col
+        dest = col
+    else:
+        for i in range(row, 4):
+            gather[i * 5 + col] = (i + 1) * 5 + col
+        dest = 20 + col
+    gather[dest] = row * 5 + col
+    return gather, dest
+
+
+SLIDE_GATHER = np.array([_slide_gather(pos[1], pos[0], slide)[0] for pos, slide in BORDER_MOVES])
+SLIDE_DEST = np.array([_slide_gather(pos[1], pos[0], slide)[1] for pos, slide in BORDER_MOVES])
+# a slide only permutes the cells, SLIDE_UNDO[m] gathers them back
+SLIDE_UNDO = np.argsort(SLIDE_GATHER, axis=1)
+
+# cells of every line of the flattened board, in the order used by check_winner:
+# rows, columns, principal and secondary diagonal
+LINES = np.array(
+    [[x * 5 + y for y in range(5)] for x in range(5)]
+    + [[x * 5 + y for x in range(5)] for y in range(5)]
+    + [[x * 5 + x for x in range(5)]]
+    + [[x * 5 + 4 - x for x in range(5)]]
+)
+ALL_LINES = np.arange(len(LINES))
+# lines that can change with each move: the ones crossing a cell moved by the slide
+MOVE_LINES = [
+    np.flatnonzero(np.isin(LINES, np.flatnonzero(gather != np.arange(25))).any(axis=1))
+    for gather in SLIDE_GATHER
+]
+
+
 class Player(ABC):
     def __init__(self) -> None:
         '''You can change this for your player if you need to handle state/have memory'''
@@ -37,18 +117,34 @@ class Game(object):
     def __init__(self) -> None:
         self._board = np.ones((5, 5), dtype=np.uint8) * -1
         self.current_player_idx = 1
+        self._board_view = None
+        # player that made the last move
+        self._last_player = None
+        self._undo_stack = []
 
     def get_board(self) -> np.ndarray:
         '''
-        Returns the board
+        Returns a read-only snapshot of the board.
+        The snapshot is taken once and shared until the board changes, copy it if you need to modify it
         '''
-        return deepcopy(self._board)
+        if self._board_view is None:
+            self._board_view = self._board.copy()
+            self._board_view.flags.writeable = False
+        return self._board_view
 
     def get_current_player(self) -> int:
         '''
         Returns the current player
         '''
-        return deepcopy(self.current_player_idx)
+        return self.current_player_idx
+
+    def legal_moves(self) -> list[tuple[tuple[int, int], Move]]:
+        '''
+        Returns the moves the current player can play: the border moves whose piece is neutral or belongs to the player
+        '''
+        pieces = self._board[BORDER_ROWS, BORDER_COLS]
+        playable = (pieces < 0) | (pieces == self.current_player_idx)
+        return [BORDER_MOVES[idx] for idx in np.flatnonzero(playable)]
 
     def print(self):
         '''Prints the board. -1 are neutral pieces, 0 are pieces of player 0, 1 pieces of player 1'''
@@ -56,156 +152,135 @@ class Game(object):
 
     def check_winner(self) -> int:
         '''Check the winner. Returns the player ID of the winner if any, otherwise returns -1'''
-        # for each row
-        for x in range(self._board.shape[0]):
-            # if a player has completed an entire row
-            if self._board[x, 0] != -1 and all(self._board[x, :] == self._board[x, 0]):
-                # return the relative id
-                return self._board[x, 0]
-        # for each column
-        for y in range(self._board.shape[1]):
-            # if a player has completed an entire column
-            if self._board[0, y] != -1 and all(self._board[:, y] == self._board[0, y]):
-                # return the relative id
-                return self._board[0, y]
-        # if a player has completed the principal diagonal
-        if self._board[0, 0] != -1 and all(
-            [self._board[x, x]
-                for x in range(self._board.shape[0])] == self._board[0, 0]
-        ):
-            # return the relative id
-            return self._board[0, 0]
-        # if a player has completed the secondary diagonal
-        if self._board[0, -1] != -1 and all(
-            [self._board[x, -(x + 1)]
-             for x in range(self._board.shape[0])] == self._board[0, -1]
-        ):
-            # return the relative id
-            return self._board[0, -1]
-        return -1
-
-    def play(self, player1: Player, player2: Player) -> int:
-        '''Play the game. Returns the winning player'''
+        return self.__check_lines(ALL_LINES)
+
+    def __check_lines(self, lines: np.ndarray) -> int:
+        '''
+        Check the winner looking only at the given lines (indices in LINES).
+        If both players have completed a line, the player that made the last move loses: by the rules,
+        a player that completes a line of the opponent loses even if he completes one of his own
+        '''
+        cells = self._board.ravel()[LINES[lines]]
+        # owner of every line whose cells are all the same
+        owners = cells[np.all(cells == cells[:, :1], axis=1), 0]
+        owners = owners[owners >= 0]
+        if len(owners) == 0:
+            return -1
+        if np.any(owners != owners[0]):
+            # lines of both players are only completed by a move, so there is a last player
+            assert self._last_player is not None
+            return 1 - self._last_player
+        return int(owners[0])
+
+    def play(self, player1: Player, player2: Player, stats: 'PlayStats | None' = None) -> int:
+        '''Play the game. Returns the winning player. If stats is given, the game is recorded in it'''
+        if stats is not None:
+            return self._play_instrumented(player1, player2, stats)
+        players = [player1, player2]
+        winner = -1
+        while winner < 0:
+            self.current_player_idx += 1
+            self.current_player_idx %= len(players)
+            from_pos, slide = players[self.current_player_idx].make_move(self)
+            while not self.__move(from_pos, slide, self.current_player_idx):
+                from_pos, slide = players[self.current_player_idx].make_move(self)
+            # only the lines crossed by the move can have been completed
+            winner = self.__check_lines(MOVE_LINES[MOVE_INDEX[(tuple(from_pos), slide)]])
+        return winner
+
+    def _play_instrumented(self, player1: Player, player2: Player, stats: 'PlayStats') -> int:
+        '''Same as play, recording the make_move latency, the rejected moves, the moves and the winner check time'''
         players = [player1, player2]
+        latencies = stats.make_move_latencies
         winner = -1
+        num_moves = 0
         while winner < 0:
             self.current_player_idx += 1
             self.current_player_idx %= len(players)
-            ok = False
-            while not ok:
-                from_pos, slide = players[self.current_player_idx].make_move(
-                    self)
-                ok = self.__move(from_pos, slide, self.current_player_idx)
-            winner = self.check_winner()
+            while True:
+                start = perf_counter()
+                from_pos, slide = players[self.current_player_idx].make_move(self)
+                latencies[self.current_player_idx].append(perf_counter() - start)
+                if self._try_move(from_pos, slide, self.current_player_idx):
+                    break
+                stats.rejected_moves[self.current_player_idx] += 1
+            num_moves += 1
+            start = perf_counter()
+            winner = self._move_winner(from_pos, slide)
+            stats.winner_check_time += perf_counter() - start
+        stats.moves_per_game.append(num_moves)
         return winner
 
+    def _try_move(self, from_pos: tuple[int, int], slide: Move, player_id: int) -> bool:
+        '''Perform a move, returns False if it is not acceptable'''
+        return self.__move(from_pos, slide, player_id)
+
+    def _move_winner(self, from_pos: tuple[int, int], slide: Move) -> int:
+        '''Returns the winner after the move just played, checking only the lines it crossed'''
+        return self.__check_lines(MOVE_LINES[MOVE_INDEX[(tuple(from_pos), slide)]])
+
+    def apply(self, move: tuple[tuple[int, int], Move]) -> bool:
+        '''
+        Play a move for the current player, then pass the turn to the other player.
+        Returns False, leaving the game untouched, if the move is not acceptable.
+        Every applied move can be taken back with undo, this is meant for search-based players
+        '''
+        from_pos, slide = move
+        move_idx = MOVE_INDEX.get((tuple(from_pos), slide))
+        if move_idx is None:
+            return False
+        taken = self._board[BORDER_ROWS[move_idx], BORDER_COLS[move_idx]]
+        last_player = self._last_player
+        if not self.__move(from_pos, slide, self.current_player_idx):
+            return False
+        self._undo_stack.append((move_idx, taken, self.current_player_idx, last_player))
+        self.current_player_idx = 1 - self.current_player_idx
+        return True
+
+    def undo(self) -> None:
+        '''Take back the last move played with apply'''
+        move_idx, taken, player_idx, last_player = self._undo_stack.pop()
+        flat = self._board.ravel()
+        flat[:] = flat[SLIDE_UNDO[move_idx]]
+        flat[BORDER_ROWS[move_idx] * 5 + BORDER_COLS[move_idx]] = taken
+        self.current_player_idx = player_idx
+        self._last_player = last_player
+        self._board_view = None
+
+    def next_state(self, move: tuple[tuple[int, int], Move]) -> np.ndarray | None:
+        '''
+        Returns the read-only board after the current player plays the move, the game is not modified.
+        Returns None if the move is not acceptable
+        '''
+        from_pos, slide = move
+        move_idx = MOVE_INDEX.get((tuple(from_pos), slide))
+        if move_idx is None or not self.__take(move_idx, self.current_player_idx):
+            return None
+        board = self._board.ravel()[SLIDE_GATHER[move_idx]]
+        board[SLIDE_DEST[move_idx]] = self.current_player_idx
+        board.flags.writeable = False
+        return board.reshape((5, 5))
+
     def __move(self, from_pos: tuple[int, int], slide: Move, player_id: int) -> bool:
         '''Perform a move'''
         if player_id > 2:
             return False
-        # Oh God, Numpy arrays
-        prev_value = deepcopy(self._board[(from_pos[1], from_pos[0])])
-        acceptable = self.__take((from_pos[1], from_pos[0]), player_id)
-        if acceptable:
-            acceptable = self.__slide((from_pos[1], from_pos[0]), slide)
-            if not acceptable:
-                self._board[(from_pos[1], from_pos[0])] = deepcopy(prev_value)
-        return acceptable
-
-    def __take(self, from_pos: tuple[int, int], player_id: int) -> bool:
-        '''Take piece'''
-        # acceptable only if in border
-        acceptable: bool = (
-            # check if it is in the first row
-            (from_pos[0] == 0 and from_pos[1] < 5)
-            # check if it is in the last row
-            or (from_pos[0] == 4 and from_pos[1] < 5)
-            # check if it is in the first column
-            or (from_pos[1] == 0 and from_pos[0] < 5)
-            # check if it is in the last column
-            or (from_pos[1] == 4 and from_pos[0] < 5)
-            # and check if the piece can be moved by the current player
-        ) and (self._board[from_pos] < 0 or self._board[from_pos] == player_id)
-        if acceptable:
-            self._board[from_pos] = player_id
-        return acceptable
-
-    def __slide(self, from_pos: tuple[int, int], slide: Move) -> bool:
-        '''Slide the other pieces'''
-        # define the corners
-        SIDES = [(0, 0), (0, 4), (4, 0), (4, 4)]
-        # if the piece position is not in a corner
-        if from_pos not in SIDES:
-            # if it is at the TOP, it can be moved down, left or right
-            acceptable_top: bool = from_pos[0] == 0 and (
-                slide == Move.BOTTOM or slide == Move.LEFT or slide == Move.RIGHT
-            )
-            # if it is at the BOTTOM, it can be moved up, left or right
-            acceptable_bottom: bool = from_pos[0] == 4 and (
-                slide == Move.TOP or slide == Move.LEFT or slide == Move.RIGHT
-            )
-            # if it is on the LEFT, it can be moved up, down or right
-            acceptable_left: bool = from_pos[1] == 0 and (
-                slide == Move.BOTTOM or slide == Move.TOP or slide == Move.RIGHT
-            )
-            # if it is on the RIGHT, it can be moved up, down or left
-            acceptable_right: bool = from_pos[1] == 4 and (
-                slide == Move.BOTTOM or slide == Move.TOP or slide == Move.LEFT
-            )
-        # if the piece position is in a corner
-        else:
-            # if it is in the upper left corner, it can be moved to the right and down
-            acceptable_top: bool = from_pos == (0, 0) and (
-                slide == Move.BOTTOM or slide == Move.RIGHT)
-            # if it is in the lower left corner, it can be moved to the right and up
-            acceptable_left: bool = from_pos == (4, 0) and (
-                slide == Move.TOP or slide == Move.RIGHT)
-            # if it is in the upper right corner, it can be moved to the left and down
-            acceptable_right: bool = from_pos == (0, 4) and (
-                slide == Move.BOTTOM or slide == Move.LEFT)
-            # if it is in the lower right corner, it can be moved to the left and up
-            acceptable_bottom: bool = from_pos == (4, 4) and (
-                slide == Move.TOP or slide == Move.LEFT)
-        # check if the move is acceptable
-        acceptable: bool = acceptable_top or acceptable_bottom or acceptable_left or acceptable_right
-        # if it is
-        if acceptable:
-            # take the piece
-            piece = self._board[from_pos]
-            # if the player wants to slide it to the left
-            if slide == Move.LEFT:
-                # for each column starting from the column of the piece and moving to the left
-                for i in range(from_pos[1], 0, -1):
-                    # copy the value contained in the same row and the previous column
-                    self._board[(from_pos[0], i)] = self._board[(
-                        from_pos[0], i - 1)]
-                # move the piece to the left
-                self._board[(from_pos[0], 0)] = piece
-            # if the player wants to slide it to the right
-            elif slide == Move.RIGHT:
-                # for each column starting from the column of the piece and moving to the right
-                for i in range(from_pos[1], self._board.shape[1] - 1, 1):
-                    # copy the value contained in the same row and the following column
-                    self._board[(from_pos[0], i)] = self._board[(
-                        from_pos[0], i + 1)]
-                # move the piece to the right
-                self._board[(from_pos[0], self._board.shape[1] - 1)] = piece
-            # if the player wants to slide it upward
-            elif slide == Move.TOP:
-                # for each row starting from the row of the piece and going upward
-                for i in range(from_pos[0], 0, -1):
-                    # copy the value contained in the same column and the previous row
-                    self._board[(i, from_pos[1])] = self._board[(
-                        i - 1, from_pos[1])]
-                # move the piece up
-                self._board[(0, from_pos[1])] = piece
-            # if the player wants to slide it downward
-            elif slide == Move.BOTTOM:
-                # for each row starting from the row of the piece and going downward
-                for i in range(from_pos[0], self._board.shape[0] - 1, 1):
-                    # copy the value contained in the same column and the following row
-                    self._board[(i, from_pos[1])] = self._board[(
-                        i + 1, from_pos[1])]
-                # move the piece down
-                self._board[(self._board.shape[0] - 1, from_pos[1])] = piece
-        return acceptable
+        # only the 44 border moves are acceptable
+        move_idx = MOVE_INDEX.get((tuple(from_pos), slide))
+        if move_idx is None or not self.__take(move_idx, player_id):
+            return False
+        self.__slide(move_idx, player_id)
+        self._last_player = player_id
+        self._board_view = None
+        return True
+
+    def __take(self, move_idx: int, player_id: int) -> bool:
+        '''Check if the piece can be taken by the player: it must be neutral or his own'''
+        piece = self._board[BORDER_ROWS[move_idx], BORDER_COLS[move_idx]]
+        return bool(piece < 0 or piece == player_id)
+
+    def __slide(self, move_idx: int, player_id: int) -> None:
+        '''Slide the other pieces towards the taken one and put the piece of the player on the opposite border'''
+        flat = self._board.ravel()
+        flat[:] = flat[SLIDE_GATHER[move_idx]]
+        flat[SLIDE_DEST[move_idx]] = player_id
@@ -0,0 +1,64 @@
+from collections import Counter
+import numpy as np
+
+# Counter of the calls to the instrumented functions (fitness, simulate_move, ...), None while counting is disabled.
+# The instrumented functions only check this global, so the overhead is near zero when it is None.
+COUNTERS: Counter | None = None
+
+
+class PlayStats:
+    """
+        Statistics collected by Game.play when a PlayStats is passed to it:
+        make_move latency and rejected moves of each player, moves per game, time spent checking the winner
+        and the calls to the instrumented functions.
+    """
+
+    def __init__(self) -> None:
+        self.make_move_latencies = [[], []]
+        self.rejected_moves = [0, 0]
+        self.moves_per_game = []
+        self.winner_check_time = 0.0
+        self.counters = Counter()
+
+    def __enter__(self) -> 'PlayStats':
+        """ Counts the calls to the instrumented functions inside the with block. """
+        global COUNTERS
+        self.__previous = COUNTERS
+        COUNTERS = self.counters
+        return self
+
+    def __exit__(self, *args) -> None:
+        global COUNTERS
+        COUNTERS = self.__previous
+
+    def merge(self, other: 'PlayStats') -> None:
+        """ Adds the statistics of another run, e.g. of a worker process. """
+        for player in range(2):
+            self.make_move_latencies[player].extend(other.make_move_latencies[player])
+            self.rejected_moves[player] += other.rejected_moves[player]
+        self.moves_per_game.extend(other.moves_per_game)
+        self.winner_check_time += other.winner_check_time
+        self.counters.update(other.counters)
+
+    def summary(self) -> dict:
+        """ Returns the statistics aggregated in a dictionary, times are in milliseconds. """
+        summary: dict[str, object] = {"games": len(self.moves_per_game)}
+        for player in range(2):
+            latencies = np.array(self.make_move_latencies[player]) * 1000
+            summary[f"player_{player}"] = {
+                "make_move_calls": len(latencies),
+                "make_move_mean_ms": float(np.mean(latencies)) if len(latencies) else 0.0,
+                "make_move_p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+                "make_move_total_ms": float(np.sum(latencies)),
+                "rejected_moves": self.rejected_moves[player],
+            }
+        summary["mean_moves_per_game"] = float(np.mean(self.moves_per_game)) if self.moves_per_game else 0.0
+        summary["winner_check_total_ms"] = self.winner_check_time * 1000
+        summary["calls"] = dict(self.counters)
+        return summary
+
+
+def count(name: str, calls: int = 1) -> None:
+    """ Counts calls to an instrumented function, if counting is enabled. """
+    if COUNTERS is not None:
+        COUNTERS[name] += calls
@@ -1,29 +1,113 @@
 from game import Game, Player
+from bitboard import BitboardGame
+from instrumentation import PlayStats
 from player.genetic_player import GeneticPlayer
 from player.random_player import RandomPlayer
 from player.qlearn_player import QLearningPlayer
+from multiprocessing import Pool
+from contextlib import nullcontext
 from tqdm import tqdm
+import os
+import random
 import time
 
+NUM_WORKERS = os.cpu_count() or 1
+SHARD_SIZE = 10
+
 def play_game(args):
     """ Play a single game of tic-tac-toe. """
-    player_1, player_2 = args
-    game = Game()
-    winner = game.play(player_1, player_2)
+    player_1, player_2, game_class, learn, stats = args
+    game = game_class()
+    winner = game.play(player_1, player_2, stats)
     
     reward = 10 if winner == 0 else -1
     if isinstance(player_1, QLearningPlayer):
-        player_1.update_q_table(reward, game)
+        if learn:
+            player_1.update_q_table(reward, game)
+        else:
+            player_1.history = []
     
     return winner
 
-def play_games(player1: Player, player2: Player, num_epochs: int = 100):
-    """ Play a number of games of tic-tac-toe. """
-    args_list = [(player1, player2) for _ in range(num_epochs)]
-    
+def play_shard(args):
+    """ Play a shard of games inside a worker process.
+        - Every game is seeded on its own, so the results do not depend on how games are split among workers.
+        - The policies are frozen inside the shard: the Q-learning experience is sent back to the parent
+          as (history, reward, final game) instead of being learned here.
+        - The moves remembered by the genetic players are sent back too.
+        - If instrument is True, the shard statistics are sent back, otherwise None.
+    """
+    player_1, player_2, game_class, seeds, instrument = args
     results = []
-    for args in tqdm(args_list, total=num_epochs, desc="Playing games"):
-        results.append(play_game(args))
+    experience = []
+    stats = PlayStats() if instrument else None
+    with stats or nullcontext():
+        for seed in seeds:
+            random.seed(seed)
+            game = game_class()
+            winner = game.play(player_1, player_2, stats)
+            results.append(winner)
+            
+            if isinstance(player_1, QLearningPlayer):
+                reward = 10 if winner == 0 else -1
+                experience.append((player_1.history, reward, game))
+                player_1.history = []
+    memories = [player.best_moves if isinstance(player, GeneticPlayer) else None for player in (player_1, player_2)]
+    return results, experience, memories, stats
+
+def play_games(player1: Player, player2: Player, num_epochs: int = 100, game_class: type[Game] = BitboardGame,
+               num_workers: int = 1, seed: int | None = None, learn: bool = True,
+               stats: PlayStats | None = None) -> tuple[int, int]:
+    """ Play a number of games of tic-tac-toe.
+        - game_class: the engine used to play, Game and BitboardGame play the same games.
+        - num_workers: with more than one worker the games are sharded across a process pool.
+          Workers play rounds of shards, after each round the Q-learning experience and the genetic players memory
+          are merged back in shard order, so the next round starts from the updated players.
+        - seed: seeds every game, the same seed and number of workers reproduce the same run.
+          With learn=False the results do not depend on the number of workers.
+        - learn: if False, the players are evaluated with frozen q-table and memory, whatever the number of workers.
+        - stats: if given, the make_move latency, the rejected moves, the moves per game, the winner check time
+          and the calls to fitness and simulate_move are recorded in it.
+    """
+    instrument = stats is not None
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    seeds = [seed + idx for idx in range(num_epochs)]
+    # a frozen evaluation only reads the genetic players memory, in the parent and in the workers
+    frozen = [] if learn else [player for player in (player1, player2)
+                               if isinstance(player, GeneticPlayer) and player.learning]
+    for player in frozen:
+        player.learning = False
+    try:
+        if num_workers <= 1:
+            results = []
+            with stats or nullcontext():
+                for game_seed in tqdm(seeds, total=num_epochs, desc="Playing games"):
+                    random.seed(game_seed)
+                    results.append(play_game((player1, player2, game_class, learn, stats)))
+        else:
+            shards = [seeds[idx:idx + SHARD_SIZE] for idx in range(0, num_epochs, SHARD_SIZE)]
+        
+            results = []
+            with Pool(num_workers) as pool, tqdm(total=num_epochs, desc="Playing games") as pbar, stats or nullcontext():
+                for start in range(0, len(shards), num_workers):
+                    args_list = [(player1, player2, game_class, shard, instrument) for shard in shards[start:start + num_workers]]
+                    for shard_results, experience, memories, shard_stats in pool.map(play_shard, args_list):
+                        results.extend(shard_results)
+                        if stats is not None and shard_stats is not None:
+                            stats.merge(shard_stats)
+                        if learn and isinstance(player1, QLearningPlayer):
+                            for history, reward, game in experience:
+                                player1.history = history
+                                player1.update_q_table(reward, game)
+                        if learn:
+                            for player, memory in zip((player1, player2), memories):
+                                if isinstance(player, GeneticPlayer) and memory is not None:
+                                    player.best_moves.merge(memory)
+                        pbar.update(len(shard_results))
+    finally:
+        for player in frozen:
+            player.learning = True
         
     player1_wins = results.count(0)
     player2_wins = results.count(1)
@@ -40,7 +124,7 @@ def main():
     
     # train QLearningPlayer against GeneticPlayer
     print(f"---- Training {player1.name()} against {player2.name()} ----")
-    play_games(player1, player2, num_epochs=200)
+    play_games(player1, player2, num_epochs=200, num_workers=NUM_WORKERS)
     
     # test QLearningPlayer against GeneticPlayer
     print(f"---- Testing {player1.name()} against {player2.name()} ----")
@@ -48,38 +132,38 @@ def main():
     if isinstance(player1, QLearningPlayer):
         player1.exploration_prob = 0
     
-    player1_wins, player2_wins = play_games(player1, player2, num_epochs=100)
+    player1_wins, player2_wins = play_games(player1, player2, num_epochs=100, num_workers=NUM_WORKERS)
     print(f"{player1.name()} wins: {player1_wins}")
     print(f"{player2.name()} wins: {player2_wins}\n")
     
     player1 = QLearningPlayer()
     # train QLearningPlayer against RandomPlayer
     print(f"---- Training {player1.name()} against {player3.name()} ----")
-    play_games(player1, player3, num_epochs=200)
+    play_games(player1, player3, num_epochs=200, num_workers=NUM_WORKERS)
     
     # test QLearningPlayer against RandomPlayer
     if isinstance(player1, QLearningPlayer):
         player1.exploration_prob = 0
     print(f"---- Testing {player1.name()} against {player3.name()} ----")
-    player1_wins, player3_wins = play_games(player1, player3, num_epochs=100)
+    player1_wins, player3_wins = play_games(player1, player3, num_epochs=100, num_workers=NUM_WORKERS)
     print(f"{player1.name()} wins: {player1_wins}")
     print(f"{player3.name()} wins: {player3_wins}\n")
     
     # GeneticPlayer against RandomPlayer
     print(f"---- Testing {player2.name()} against {player3.name()} ----")
-    player2_wins, player3_wins = play_games(player2, player3, num_epochs=100)
+    player2_wins, player3_wins = play_games(player2, player3, num_epochs=100, num_workers=NUM_WORKERS)
     print(f"{player2.name()} wins: {player2_wins}")
     print(f"{player3.name()} wins: {player3_wins}\n")
     
     # GeneticPlayer against GeneticPlayer without memory
     print(f"---- Testing {player2.name()} against {player4.name()} ----")
-    player2_wins, player4_wins = play_games(player2, player4, num_epochs=100)
+    player2_wins, player4_wins = play_games(player2, player4, num_epochs=100, num_workers=NUM_WORKERS)
     print(f"{player2.name()} wins: {player2_wins}")
     print(f"{player4.name()} wins: {player4_wins}\n")
     
     # GeneticPlayer without memory against RandomPlayer
     print(f"---- Testing {player4.name()} against {player3.name()} ----")
-    player4_wins, player3_wins = play_games(player4, player3, num_epochs=100)
+    player4_wins, player3_wins = play_games(player4, player3, num_epochs=100, num_workers=NUM_WORKERS)
     print(f"{player4.name()} wins: {player4_wins}")
     print(f"{player3.name()} wins: {player3_wins}\n")
     
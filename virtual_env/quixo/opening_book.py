@@ -0,0 +1,169 @@
+""" Opening book and endgame table of Quixo, precomputed offline and looked up by the players before searching.
+
+    python opening_book.py --output opening_book.npy                  build the book with the default budgets
+    python opening_book.py --plies 4 --endgame-games 2000 --output opening_book.npy
+
+    Positions are reduced by symmetry: the book stores one entry for the 8 symmetric boards,
+    as a sorted array of (canonical key, canonical move) records memory-mapped at load time.
+"""
+import argparse
+import random
+import time
+from copy import deepcopy
+import numpy as np
+from game import Game, Move
+from bitboard import BitboardGame
+from transposition import canonical_key, to_canonical, from_canonical
+from player.alphabeta_player import AlphaBetaPlayer, WIN_SCORE
+from player.random_player import RandomPlayer
+
+BOOK_DTYPE = np.dtype([("key", np.int64), ("move", np.int8)])
+# the player to move is stored above the 50 bits of the board key
+PLAYER_SHIFT = 50
+
+
+def book_key(board: np.ndarray, player: int) -> tuple[int, int]:
+    """ Returns the key of the position (canonical board and player to move) and the symmetry of the canonical board. """
+    key, symmetry = canonical_key(board)
+    return key | (player << PLAYER_SHIFT), symmetry
+
+
+class OpeningBook:
+    """
+        Read-only table of precomputed moves, built by build_book.
+        The records are memory-mapped, so loading is immediate and processes share the pages;
+        a lookup is a binary search on the sorted keys.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._entries = np.load(path, mmap_mode="r")
+        self._keys = self._entries["key"]
+        self._moves = self._entries["move"]
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getstate__(self) -> dict:
+        # worker processes map the file again instead of receiving a copy of the records
+        return {"path": self.path, "hits": self.hits, "misses": self.misses}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["path"])
+        self.hits, self.misses = state["hits"], state["misses"]
+
+    def lookup(self, game: 'Game') -> tuple[tuple[int, int], Move] | None:
+        """ Returns the book move of the position, None if the position is not in the book. """
+        key, symmetry = book_key(game.get_board(), game.get_current_player())
+        idx = int(np.searchsorted(self._keys, key))
+        if idx == len(self._keys) or self._keys[idx] != key:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return from_canonical(int(self._moves[idx]), symmetry)
+
+
+def opening_positions(plies: int) -> list[Game]:
+    """ Returns the positions of the first plies of the game, one for each class of symmetric positions. """
+    game = BitboardGame()
+    game.current_player_idx = 0
+    frontier = [game]
+    seen = {book_key(game.get_board(), 0)[0]}
+    positions = []
+    for ply in range(plies):
+        positions.extend(frontier)
+        if ply == plies - 1:
+            break
+        next_frontier = []
+        for game in frontier:
+            for move in game.legal_moves():
+                game.apply(move)
+                key = book_key(game.get_board(), game.get_current_player())[0]
+                if game.check_winner() < 0 and key not in seen:
+                    seen.add(key)
+                    next_frontier.append(deepcopy(game))
+                game.undo()
+        frontier = next_frontier
+    return positions
+
+
+def endgame_positions(num_games: int, last_plies: int, seed: int) -> list[Game]:
+    """ Returns the last positions before the end of random games, where forced wins are likely. """
+    random.seed(seed)
+    player = RandomPlayer()
+    positions = []
+    for _ in range(num_games):
+        game = BitboardGame()
+        game.current_player_idx = 0
+        history = []
+        while game.check_winner() < 0:
+            history.append(deepcopy(game))
+            game.apply(player.make_move(game))
+        positions.extend(history[-last_plies:])
+    return positions
+
+
+def build_book(path: str, plies: int = 3, opening_budget: int = 20_000, endgame_games: int = 500,
+               endgame_plies: int = 6, endgame_depth: int = 3, seed: int = 42, verbose: bool = True) -> int:
+    """
+        Precomputes the book and saves it to path (a .npy file). Returns the number of entries.
+        - plies: the positions of the first plies are searched with opening_budget nodes each.
+        - endgame_games: random games whose last endgame_plies positions are searched to endgame_depth,
+          only the positions with a forced win are kept.
+        A forced win replaces the opening move of the same position.
+    """
+    entries = {}
+    start = time.perf_counter()
+    player = AlphaBetaPlayer(time_budget=np.inf, node_budget=opening_budget)
+    for game in opening_positions(plies):
+        key, symmetry = book_key(game.get_board(), game.get_current_player())
+        _, move = player.search(game)
+        entries[key] = to_canonical(move, symmetry)
+    if verbose:
+        print(f"openings: {len(entries)} positions in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    player = AlphaBetaPlayer(time_budget=np.inf, max_depth=endgame_depth)
+    forced_wins = 0
+    seen = set()
+    for game in endgame_positions(endgame_games, endgame_plies, seed):
+        key, symmetry = book_key(game.get_board(), game.get_current_player())
+        if key in seen:
+            continue
+        seen.add(key)
+        score, move = player.search(game)
+        if score >= WIN_SCORE:
+            entries[key] = to_canonical(move, symmetry)
+            forced_wins += 1
+    if verbose:
+        print(f"forced wins: {forced_wins} of {len(seen)} positions in {time.perf_counter() - start:.1f}s")
+
+    records = np.zeros(len(entries), dtype=BOOK_DTYPE)
+    records["key"] = list(entries.keys())
+    records["move"] = list(entries.values())
+    records.sort(order="key")
+    np.save(path, records)
+    return len(records)
+
+
+def main():
+    """ Main function. """
+    parser = argparse.ArgumentParser(description="Quixo opening book and endgame table builder")
+    parser.add_argument("--output", default="opening_book.npy", help="the .npy file of the book")
+    parser.add_argument("--plies", type=int, default=3, help="search the positions of the first plies")
+    parser.add_argument("--opening-budget", type=int, default=20_000, help="nodes searched for each opening position")
+    parser.add_argument("--endgame-games", type=int, default=500, help="random games searched for forced wins")
+    parser.add_argument("--endgame-plies", type=int, default=6, help="positions searched at the end of every game")
+    parser.add_argument("--endgame-depth", type=int, default=3, help="depth of the forced wins search")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    size = build_book(args.output, args.plies, args.opening_budget, args.endgame_games,
+                      args.endgame_plies, args.endgame_depth, args.seed)
+    print(f"{size} entries saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
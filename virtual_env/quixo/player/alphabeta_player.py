@@ -0,0 +1,143 @@
+import time
+from copy import deepcopy
+from typing import TYPE_CHECKING
+import numpy as np
+from game import Player, Move, Game
+from utils import batch_fitness, line_scores
+
+if TYPE_CHECKING:
+    from opening_book import OpeningBook
+
+WIN_SCORE = 10_000
+# nodes between two reads of the clock, a node costs tens of microseconds so the deadline is overrun by
+# at most about a millisecond
+CLOCK_INTERVAL = 16
+
+
+class SearchTimeout(Exception):
+    """ Raised inside the search when the time or node budget is over. """
+
+
+class AlphaBetaPlayer(Player):
+    def __init__(self, time_budget: float = 0.5, node_budget: int | None = None, max_depth: int = 8,
+                 book: 'OpeningBook | None' = None) -> None:
+        super().__init__()
+        self.time_budget = time_budget
+        self.node_budget = node_budget
+        self.max_depth = max_depth
+        # precomputed moves, looked up before searching
+        self.book = book
+        # search statistics, summed over all the moves
+        self.nodes = 0
+        self.search_time = 0.0
+        self.moves = 0
+        self.depth_reached = 0
+        self.__deadline = 0.0
+        self.__max_nodes = None
+
+    def name(self) -> str:
+        """ Returns the name of the player. """
+        return "Alpha-Beta Player"
+
+    def nodes_per_second(self) -> float:
+        """ Returns the average number of nodes searched per second. """
+        return self.nodes / self.search_time if self.search_time > 0 else 0.0
+
+    def stats(self) -> dict[str, float]:
+        """ Returns the search statistics. """
+        return {
+            "nodes": self.nodes,
+            "nodes_per_second": self.nodes_per_second(),
+            "average_depth": self.depth_reached / self.moves if self.moves else 0.0,
+            "average_time": self.search_time / self.moves if self.moves else 0.0,
+        }
+
+    def make_move(self, game: 'Game') -> tuple[tuple[int, int], Move]:
+        """ Returns the book move of the position if there is one, otherwise the best move found by the search. """
+        if self.book is not None:
+            move = self.book.lookup(game)
+            if move is not None:
+                return move
+        return self.search(game)[1]
+
+    def search(self, game: 'Game') -> tuple[float, tuple[tuple[int, int], Move]]:
+        """
+            Iterative deepening alpha-beta search, it returns the score and the best move of the deepest completed search.
+            A score of at least WIN_SCORE is a forced win, the score is -inf if not even the depth 1 search completed.
+        """
+        start = time.perf_counter()
+        self.__deadline = start + self.time_budget
+        self.__max_nodes = None if self.node_budget is None else self.nodes + self.node_budget
+        # the search plays on its own copy of the game with apply/undo
+        search_game = deepcopy(game)
+
+        best_score = -np.inf
+        best_move = self.__order_moves(search_game, search_game.legal_moves())[0]
+        for depth in range(1, self.max_depth + 1):
+            try:
+                best_score, best_move = self.__root(search_game, depth, best_move)
+            except SearchTimeout:
+                break
+            self.depth_reached += 1
+
+        self.search_time += time.perf_counter() - start
+        self.moves += 1
+        return best_score, best_move
+
+    def __root(self, game: 'Game', depth: int, previous_best: tuple[tuple[int, int], Move]) -> tuple[float, tuple[tuple[int, int], Move]]:
+        """ Search the root, trying first the best move of the previous iteration. """
+        moves = self.__order_moves(game, game.legal_moves())
+        moves.remove(previous_best)
+        moves.insert(0, previous_best)
+
+        alpha, beta = -np.inf, np.inf
+        best_move = previous_best
+        for move in moves:
+            score = self.__score_move(game, move, depth, alpha, beta)
+            if score > alpha:
+                alpha, best_move = score, move
+        return alpha, best_move
+
+    def __negamax(self, game: 'Game', depth: int, alpha: float, beta: float) -> float:
+        """ Returns the score of the position for the player to move. """
+        for move in self.__order_moves(game, game.legal_moves()):
+            score = self.__score_move(game, move, depth, alpha, beta)
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+        return alpha
+
+    def __score_move(self, game: 'Game', move: tuple[tuple[int, int], Move], depth: int, alpha: float, beta: float) -> float:
+        """ Returns the score of the move for the player that plays it. """
+        self.nodes += 1
+        if self.nodes % CLOCK_INTERVAL == 0 and time.perf_counter() > self.__deadline:
+            raise SearchTimeout()
+        if self.__max_nodes is not None and self.nodes > self.__max_nodes:
+            raise SearchTimeout()
+
+        player = game.get_current_player()
+        game.apply(move)
+        try:
+            winner = game.check_winner()
+            if winner >= 0:
+                # prefer the quickest wins and the slowest losses
+                score = (WIN_SCORE + depth) if winner == player else -(WIN_SCORE + depth)
+            elif depth == 1:
+                score = self.__evaluate(game.get_board(), player)
+            else:
+                score = -self.__negamax(game, depth - 1, -beta, -alpha)
+        finally:
+            game.undo()
+        return score
+
+    def __evaluate(self, board: np.ndarray, player: int) -> float:
+        """ Heuristic score of a board: lines almost completed are worth much more than scattered pieces. """
+        scores = line_scores(board[np.newaxis], player)[0]
+        opponent_scores = line_scores(board[np.newaxis], 1 - player)[0]
+        return float(np.sum(scores ** 2) - np.sum(opponent_scores ** 2))
+
+    def __order_moves(self, game: 'Game', moves: list[tuple[tuple[int, int], Move]]) -> list[tuple[tuple[int, int], Move]]:
+        """ Sort the moves by decreasing fitness, so that the cutoffs happen as soon as possible. """
+        scores = batch_fitness(moves, game)
+        return [moves[idx] for idx in np.argsort(-scores, kind="stable")]
@@ -1,14 +1,25 @@
 import random
 from game import Player, Move, Game
-from utils import verifie_move, fitness
+from utils import batch_fitness
+from transposition import TranspositionTable, canonical_key, to_canonical, from_canonical
 
 class GeneticPlayer(Player):
-    def __init__(self, population_size=50, generations=10, memory=1) -> None:
+    def __init__(self, population_size=50, generations=10, memory=1, memory_size=1_000_000, book=None) -> None:
         super().__init__()
         self.population_size = population_size
         self.generations = generations
-        self.best_moves = {}
+        # best move found for each board, boards are reduced by symmetry
+        self.best_moves = TranspositionTable(memory_size)
         self.memory = memory
+        # if False, best_moves is only read: the memory is frozen, e.g. to evaluate the player
+        self.learning = True
+        # precomputed moves (an OpeningBook), looked up before evolving a population
+        self.book = book
+        # fitness of the moves already evaluated on the board of the current turn
+        self.fitness_cache = {}
+        self.cache_board = None
+        self.cache_hits = 0
+        self.cache_misses = 0
     
     def name(self) -> str:
         """ Returns the name of the player. """
@@ -18,46 +29,73 @@ class GeneticPlayer(Player):
     
     def make_move(self, game: 'Game') -> tuple[tuple[int, int], Move]:
         """ Returns the best move for the current game state. """
-        current_board = tuple(map(tuple, game.get_board()))
+        if self.book is not None:
+            move = self.book.lookup(game)
+            if move is not None:
+                return move
         
-        population = self.__generate_random_population(game)
+        legal_moves = game.legal_moves()
+        
+        board_key = (game.get_board().tobytes(), game.get_current_player())
+        if board_key != self.cache_board:
+            self.fitness_cache = {}
+            self.cache_board = board_key
+        
+        population = self.__generate_random_population(legal_moves)
         
         for _ in range(self.generations):
-            population = self.__evolve_population(population, game)
+            population = self.__evolve_population(population, legal_moves, game)
             
-        sorted_population = sorted(population, key=lambda move: fitness(move[0], move[1], game), reverse=True)
+        sorted_population = self.__sort_population(population, game)
         best_from_pos, best_slide = sorted_population[0]
         
         if self.memory:
-            if current_board not in self.best_moves:
-                self.best_moves[current_board] = (best_from_pos, best_slide)
+            current_board, symmetry = canonical_key(game.get_board())
+            entry = self.best_moves.get(current_board)
+            if entry is None:
+                if self.learning:
+                    self.best_moves.put(current_board, to_canonical((best_from_pos, best_slide), symmetry))
             else:
-                if fitness(best_from_pos, best_slide, game) > fitness(self.best_moves[current_board][0], self.best_moves[current_board][1], game):
-                    self.best_moves[current_board] = (best_from_pos, best_slide)
+                memory_move = from_canonical(entry[0], symmetry)
+                best_fitness, memory_fitness = self.__fitness([(best_from_pos, best_slide), memory_move], game)
+                if best_fitness > memory_fitness:
+                    if self.learning:
+                        self.best_moves.put(current_board, to_canonical((best_from_pos, best_slide), symmetry))
                 else:
-                    best_from_pos, best_slide = self.best_moves[current_board]
+                    best_from_pos, best_slide = memory_move
 
         return best_from_pos, best_slide
     
-    def __generate_random_population(self, game: 'Game') -> list[tuple[tuple[int, int], Move]]:
+    def cache_info(self) -> dict[str, int]:
+        """ Returns the hits and misses of the fitness cache, every miss is a simulated move. """
+        return {"hits": self.cache_hits, "misses": self.cache_misses, "size": len(self.fitness_cache)}
+    
+    def __fitness(self, moves: list[tuple[tuple[int, int], Move]], game: 'Game') -> list[int]:
+        """ Returns the fitness of the moves, only the moves not in the cache are evaluated (all at once). """
+        missing = list(dict.fromkeys(move for move in moves if move not in self.fitness_cache))
+        self.cache_misses += len(missing)
+        self.cache_hits += len(moves) - len(missing)
+        if missing:
+            self.fitness_cache.update(zip(missing, batch_fitness(missing, game).tolist()))
+        return [self.fitness_cache[move] for move in moves]
+    
+    def __sort_population(self, population: list[tuple[tuple[int, int], Move]], game: 'Game') -> list[tuple[tuple[int, int], Move]]:
+        """ Sort the population by decreasing fitness. """
+        scores = self.__fitness(population, game)
+        order = sorted(range(len(population)), key=lambda idx: scores[idx], reverse=True)
+        return [population[idx] for idx in order]
+    
+    def __generate_random_population(self, legal_moves: list[tuple[tuple[int, int], Move]]) -> list[tuple[tuple[int, int], Move]]:
         """ Generate a random population of moves. """
-        population = []
-        for _ in range(self.population_size):
-            while True:
-                from_pos = (random.randint(0, 4), random.randint(0, 4))
-                slide = random.choice([Move.TOP, Move.BOTTOM, Move.LEFT, Move.RIGHT])
-                if verifie_move(from_pos, slide, game):
-                    population.append((from_pos, slide))
-                    break
-        return population
+        return random.choices(legal_moves, k=self.population_size)
     
-    def __evolve_population(self, population: list[tuple[tuple[int, int], Move]], game: 'Game') -> list[tuple[tuple[int, int], Move]]:
+    def __evolve_population(self, population: list[tuple[tuple[int, int], Move]], legal_moves: list[tuple[tuple[int, int], Move]], game: 'Game') -> list[tuple[tuple[int, int], Move]]:
         """ Evolve the population. 
             - Select the best individuals from the population based on their fitness.
             - Crossover the best individuals to create new offspring.
             - Mutate the offspring.
         """       
-        sorted_population = sorted(population, key=lambda move: fitness(move[0], move[1], game), reverse=True)
+        sorted_population = self.__sort_population(population, game)
         elite_size = int(self.population_size * 0.2)
         elite = sorted_population[:elite_size]
         
@@ -68,16 +106,12 @@ class GeneticPlayer(Player):
             child1 = parent_1[:crossover_point] + parent_2[crossover_point:]
             offspring.append(child1)
         
-        mutated_offspring = [self.__mutate(move, game) for move in offspring]
+        mutated_offspring = [self.__mutate(move, legal_moves) for move in offspring]
         return elite + mutated_offspring
     
-    def __mutate(self, move: tuple[tuple[int, int], Move], game: Game) -> tuple[tuple[int, int], Move]:
+    def __mutate(self, move: tuple[tuple[int, int], Move], legal_moves: list[tuple[tuple[int, int], Move]]) -> tuple[tuple[int, int], Move]:
         """ Mutate the move -> randomly change the from_pos and slide."""
         mutation_rate = 0.2
         if random.uniform(0, 1) < mutation_rate:
-            while True:
-                from_pos = (random.randint(0, 4), random.randint(0, 4))
-                slide = random.choice([Move.TOP, Move.BOTTOM, Move.LEFT, Move.RIGHT])
-                if verifie_move(from_pos, slide, game):
-                    return from_pos, slide
+            return random.choice(legal_moves)
         return move
\ No newline at end of file
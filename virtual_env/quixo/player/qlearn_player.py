@@ -1,16 +1,24 @@
 import random
 import numpy as np
-from game import Player, Move, Game
-from utils import verifie_move, fitness
+from game import Player, Move, Game, BORDER_MOVES, MOVE_INDEX
+from utils import verifie_move, fitness, batch_fitness
+from transposition import TranspositionTable, canonical_key, to_canonical, from_canonical
+from replay import ReplayBuffer
 
 class QLearningPlayer(Player):
-    def __init__(self, learning_rate=0.1, discount_factor=0.9, exploration_prob=0.1):
+    def __init__(self, learning_rate=0.1, discount_factor=0.9, exploration_prob=0.1, table_size: int | None = 1_000_000,
+                 replay_capacity=100_000, replay_batches=0, batch_size=32):
         super().__init__()
         self.learning_rate = learning_rate
         self.discount_factor = discount_factor
         self.exploration_prob = exploration_prob
-        self.q_table = {}
+        # (move, value) for each state, states are reduced by symmetry
+        self.q_table = TranspositionTable(table_size)
         self.history = []
+        # past experiences, replay_batches batches of them are learned again after every game
+        self.replay_buffer = ReplayBuffer(replay_capacity)
+        self.replay_batches = replay_batches
+        self.batch_size = batch_size
     
     def name(self) -> str:
         """ Returns the name of the player. """
@@ -18,7 +26,7 @@ class QLearningPlayer(Player):
     
     def make_move(self, game: 'Game') -> tuple[tuple[int, int], Move]:
         """ Eplore the environment or exploit the q-table. """
-        current_state = tuple(map(tuple, game.get_board()))
+        current_state = canonical_key(game.get_board())
         
         if random.uniform(0, 1) < self.exploration_prob:
             # Explore
@@ -32,51 +40,73 @@ class QLearningPlayer(Player):
     
     def __explore(self, game: 'Game') -> tuple[tuple[int, int], Move]:
         """ Explore the environment """
-        while True:
-            from_pos = (random.randint(0, 4), random.randint(0, 4))
-            move = random.choice([Move.TOP, Move.BOTTOM, Move.LEFT, Move.RIGHT])
-            if verifie_move(from_pos, move, game):
-                return from_pos, move
+        return random.choice(game.legal_moves())
     
-    def __exploit(self, current_state: tuple, game: 'Game') -> tuple[tuple[int, int], Move]:
+    def __exploit(self, current_state: tuple[int, int], game: 'Game') -> tuple[tuple[int, int], Move]:
         """ Exploit the q-table
             - If the current state is not in the q-table, explore the environment.
             - Else, choose the best move from the q-table.
         """
-        current_state = tuple(map(tuple, current_state))
+        key, symmetry = current_state
         
-        state = self.q_table.get(current_state)
+        state = self.q_table.get(key)
         if state is not None:
-            from_pos = state["from_pos"]
-            move = state["move"]
+            from_pos, move = from_canonical(state[0], symmetry)
             if verifie_move(from_pos, move, game):
                 return from_pos, move
 
-        while True:
-            possible_moves = [Move.TOP, Move.BOTTOM, Move.LEFT, Move.RIGHT]
-            from_pos = (random.randint(0, 4), random.randint(0, 4))
-            move = max(possible_moves, key=lambda move: fitness(from_pos, move, game))
-            if verifie_move(from_pos, move, game):
-                return from_pos, move
+        legal_moves = game.legal_moves()
+        from_pos = random.choice(list(dict.fromkeys(pos for pos, _ in legal_moves)))
+        possible_moves = [move for pos, move in legal_moves if pos == from_pos]
+        move = max(possible_moves, key=lambda move: fitness(from_pos, move, game))
+        return from_pos, move
 
     def update_q_table(self, reward: float, game: Game) -> None:
         """ Update the q-table using the reward.
             - If the current state is not in the q-table, add it.
             - Else, update the q-table.
         """
-        for state, from_pos, move in reversed(self.history):
-            if state not in self.q_table:
-                self.q_table[state] = {
-                    "value": 0,
-                    "from_pos": from_pos,
-                    "move": move
-                }
+        # fitness of every move on the final board, computed once for the whole history
+        final_fitness = batch_fitness(BORDER_MOVES, game)
+        experience = []
+        for (key, symmetry), from_pos, move in reversed(self.history):
+            state = self.q_table.get(key)
+            if state is None:
+                move_idx, value = to_canonical((from_pos, move), symmetry), 0
+                self.q_table.put(key, move_idx, value)
             else:
-                if fitness(from_pos, move, game) > fitness(self.q_table[state]["from_pos"], self.q_table[state]["move"], game):
-                    self.q_table[state]["from_pos"] = from_pos
-                    self.q_table[state]["move"] = move
-            max_value = max(self.q_table[state]["value"] for state in self.q_table)
-            self.q_table[state]["value"] += self.learning_rate * (reward + self.discount_factor * max_value - self.q_table[state]["value"])
+                move_idx, value = state
+                memory_move = from_canonical(move_idx, symmetry)
+                if final_fitness[MOVE_INDEX[(tuple(from_pos), move)]] > final_fitness[MOVE_INDEX[memory_move]]:
+                    move_idx = to_canonical((from_pos, move), symmetry)
+            # the table keeps track of its largest value
+            max_value = self.q_table.max_value()
+            value += self.learning_rate * (reward + self.discount_factor * max_value - value)
+            self.q_table.put(key, move_idx, value)
+            experience.append((key, to_canonical((from_pos, move), symmetry)))
 
+        if experience:
+            keys, moves = zip(*experience)
+            self.replay_buffer.extend(keys, moves, np.full(len(keys), reward))
+        for _ in range(self.replay_batches):
+            self.replay(self.batch_size)
         self.history = []
-        
\ No newline at end of file
+
+    def replay(self, batch_size: int) -> None:
+        """ Learn again a batch of experiences sampled from the replay buffer.
+            - The value of each sampled state is updated as in update_q_table.
+            - The move stored in the q-table is kept, the move of the experience is stored only for unknown states.
+        """
+        if len(self.replay_buffer) == 0:
+            return
+        keys, moves, rewards = self.replay_buffer.sample(batch_size)
+        for key, move_idx, reward in zip(keys.tolist(), moves.tolist(), rewards.tolist()):
+            state = self.q_table.get(key)
+            if state is not None:
+                move_idx, value = state
+            else:
+                value = 0
+                self.q_table.put(key, move_idx, value)
+            max_value = self.q_table.max_value()
+            value += self.learning_rate * (reward + self.discount_factor * max_value - value)
+            self.q_table.put(key, move_idx, value)
@@ -1,6 +1,7 @@
 import random
+import numpy as np
 from game import Game, Move, Player
-from utils import verifie_move
+from vector_game import VectorGame, random_moves
 
 class RandomPlayer(Player):
     def __init__(self) -> None:
@@ -10,8 +11,8 @@ class RandomPlayer(Player):
         return "Random Player"
 
     def make_move(self, game: 'Game') -> tuple[tuple[int, int], Move]:
-        while True:
-            from_pos = (random.randint(0, 4), random.randint(0, 4))
-            slide = random.choice([Move.TOP, Move.BOTTOM, Move.LEFT, Move.RIGHT])
-            if verifie_move(from_pos, slide, game):
-                return from_pos, slide
\ No newline at end of file
+        return random.choice(game.legal_moves())
+
+    def make_moves(self, games: 'VectorGame') -> np.ndarray:
+        """ Returns a random move for each game of a VectorGame. """
+        return random_moves(games)
@@ -0,0 +1,55 @@
+import random
+import numpy as np
+from numpy.typing import ArrayLike
+
+
+class ReplayBuffer:
+    """
+        Fixed-capacity ring buffer of (state key, move index, reward) experiences.
+        State keys and move indices are the canonical ones used by TranspositionTable,
+        when the buffer is full the oldest experiences are overwritten.
+    """
+
+    def __init__(self, capacity: int = 100_000) -> None:
+        self.capacity = capacity
+        self.keys = np.zeros(capacity, dtype=np.int64)
+        self.moves = np.zeros(capacity, dtype=np.int8)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self._next = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def extend(self, keys: ArrayLike, moves: ArrayLike, rewards: ArrayLike) -> None:
+        """ Adds a batch of experiences. """
+        keys, moves, rewards = np.asarray(keys), np.asarray(moves), np.asarray(rewards)
+        if len(keys) > self.capacity:
+            keys, moves, rewards = keys[-self.capacity:], moves[-self.capacity:], rewards[-self.capacity:]
+        positions = (self._next + np.arange(len(keys))) % self.capacity
+        self.keys[positions] = keys
+        self.moves[positions] = moves
+        self.rewards[positions] = rewards
+        self._next = (self._next + len(keys)) % self.capacity
+        self._size = min(self._size + len(keys), self.capacity)
+
+    def sample(self, batch_size: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+            Returns a batch of experiences drawn uniformly with replacement, with random like the players,
+            so a game seeded by play_games replays the same experiences.
+        """
+        positions = random.choices(range(self._size), k=batch_size)
+        return self.keys[positions], self.moves[positions], self.rewards[positions]
+
+    def save(self, path: str) -> None:
+        """ Saves the experiences, from the oldest to the newest, as compressed arrays. """
+        order = (self._next - self._size + np.arange(self._size)) % self.capacity
+        np.savez_compressed(path, keys=self.keys[order], moves=self.moves[order], rewards=self.rewards[order])
+
+    @classmethod
+    def load(cls, path: str, capacity: int = 100_000) -> 'ReplayBuffer':
+        """ Loads a buffer saved with save, keeping the newest experiences if they do not fit. """
+        buffer = cls(capacity)
+        with np.load(path) as data:
+            buffer.extend(data["keys"], data["moves"], data["rewards"])
+        return buffer
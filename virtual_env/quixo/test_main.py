@@ -0,0 +1,13 @@
+from main import play_games
+from player.genetic_player import GeneticPlayer
+
+
+def test_frozen_evaluation_does_not_depend_on_the_workers():
+    """ With learn=False the genetic memory is only read, so the games are the same with any number of workers. """
+    results = []
+    for num_workers in (1, 3):
+        player1, player2 = GeneticPlayer(), GeneticPlayer(memory=0)
+        results.append(play_games(player1, player2, num_epochs=30, num_workers=num_workers, seed=1, learn=False))
+        assert len(player1.best_moves) == 0
+        assert player1.learning
+    assert results[0] == results[1]
@@ -0,0 +1,172 @@
+from collections import OrderedDict
+import numpy as np
+from game import BORDER_MOVES, MOVE_INDEX, Move
+
+# The 8 symmetries of the board (4 rotations, each one with or without a reflection),
+# as matrices acting on the (row, col) coordinates centered on the middle cell.
+_ROTATION = np.array([[0, 1], [-1, 0]])
+_REFLECTION = np.array([[0, 1], [1, 0]])
+SYMMETRIES = [
+    np.linalg.matrix_power(_ROTATION, k) @ reflection
+    for k in range(4)
+    for reflection in (np.eye(2, dtype=int), _REFLECTION)
+]
+
+# (row, col) direction in which each slide pushes the piece
+_DIRECTIONS = {Move.TOP: (-1, 0), Move.BOTTOM: (1, 0), Move.LEFT: (0, -1), Move.RIGHT: (0, 1)}
+_SLIDES: dict[tuple, Move] = {direction: slide for slide, direction in _DIRECTIONS.items()}
+
+
+def _transform_cell(matrix: np.ndarray, row: int, col: int) -> tuple[int, int]:
+    """ Returns the cell a symmetry sends (row, col) to. """
+    new_row, new_col = matrix @ np.array([row - 2, col - 2]) + 2
+    return int(new_row), int(new_col)
+
+
+def _transform_move(matrix: np.ndarray, move: tuple[tuple[int, int], Move]) -> tuple[tuple[int, int], Move]:
+    """ Returns the move that plays on the transformed board the same as move on the original one. """
+    (col, row), slide = move
+    new_row, new_col = _transform_cell(matrix, row, col)
+    direction = tuple(int(d) for d in matrix @ np.array(_DIRECTIONS[slide]))
+    return (new_col, new_row), _SLIDES[direction]
+
+
+# transformed flat board = flat board[BOARD_SYMMETRIES[s]]
+BOARD_SYMMETRIES = np.zeros((len(SYMMETRIES), 25), dtype=np.intp)
+for _s, _matrix in enumerate(SYMMETRIES):
+    for _row in range(5):
+        for _col in range(5):
+            _new_row, _new_col = _transform_cell(_matrix, _row, _col)
+            BOARD_SYMMETRIES[_s, _new_row * 5 + _new_col] = _row * 5 + _col
+# MOVE_SYMMETRIES[s, m]: index of the move m once the symmetry s is applied
+MOVE_SYMMETRIES = np.array([
+    [MOVE_INDEX[_transform_move(_matrix, move)] for move in BORDER_MOVES]
+    for _matrix in SYMMETRIES
+])
+# MOVE_SYMMETRIES_INV[s, m]: index of the move that is sent to m by the symmetry s
+MOVE_SYMMETRIES_INV = np.argsort(MOVE_SYMMETRIES, axis=1)
+
+# every cell is packed in 2 bits: 0 neutral, 1 player 0, 2 player 1
+_SHIFTS = np.arange(0, 50, 2, dtype=np.int64)
+
+
+def state_key(board: np.ndarray) -> int:
+    """ Packs a board in a 50-bit integer. """
+    return int(np.sum((np.asarray(board, dtype=np.int64).ravel() + 1) << _SHIFTS))
+
+
+def canonical_key(board: np.ndarray) -> tuple[int, int]:
+    """
+        Returns the key of the canonical board (the symmetric board with the smallest key)
+        and the symmetry that transforms the board into it.
+    """
+    flat = np.asarray(board, dtype=np.int64).ravel()
+    keys = np.sum((flat[BOARD_SYMMETRIES] + 1) << _SHIFTS, axis=1)
+    symmetry = int(np.argmin(keys))
+    return int(keys[symmetry]), symmetry
+
+
+def to_canonical(move: tuple[tuple[int, int], Move], symmetry: int) -> int:
+    """ Returns the index of the move on the canonical board. """
+    return int(MOVE_SYMMETRIES[symmetry, MOVE_INDEX[(tuple(move[0]), move[1])]])
+
+
+def from_canonical(move_idx: int, symmetry: int) -> tuple[tuple[int, int], Move]:
+    """ Returns the move on the original board given its index on the canonical board. """
+    return BORDER_MOVES[MOVE_SYMMETRIES_INV[symmetry, move_idx]]
+
+
+class TranspositionTable:
+    """
+        Bounded table of (move index, value) entries keyed by canonical board keys.
+        Keys are mapped to slots of flat move and value arrays, when the table is full
+        the slot of the least recently used entry is reused.
+        The largest value is tracked on every update, so max_value does not scan the table.
+    """
+
+    def __init__(self, max_size: int | None = 1_000_000) -> None:
+        self.max_size = max_size
+        self._slots = OrderedDict()
+        self._moves = np.zeros(1024, dtype=np.int8)
+        self._values = np.zeros(1024, dtype=np.float64)
+        self._max_slot = None
+        # the largest value must be searched again (the entry holding it decreased or was evicted)
+        self._max_stale = False
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._slots
+
+    def get(self, key: int) -> tuple[int, float] | None:
+        """ Returns the (move index, value) entry of the key, if any. """
+        slot = self._slots.get(key)
+        if slot is None:
+            return None
+        self._slots.move_to_end(key)
+        return int(self._moves[slot]), float(self._values[slot])
+
+    def put(self, key: int, move_idx: int, value: float = 0) -> None:
+        """ Adds or replaces the entry of the key, evicting the least recently used one if needed. """
+        slot = self._slots.get(key)
+        if slot is not None:
+            self._slots.move_to_end(key)
+        else:
+            slot = self.__new_slot()
+            self._slots[key] = slot
+        if self._max_slot is None or (not self._max_stale and value >= self._values[self._max_slot]):
+            self._max_slot, self._max_stale = slot, False
+        elif slot == self._max_slot:
+            self._max_stale = True
+        self._moves[slot] = move_idx
+        self._values[slot] = value
+
+    def __new_slot(self) -> int:
+        """ Returns a free slot, growing the arrays or evicting the least recently used entry. """
+        size = len(self._slots)
+        if self.max_size is not None and size >= self.max_size:
+            _, slot = self._slots.popitem(last=False)
+            if slot == self._max_slot:
+                self._max_stale = True
+            return slot
+        if size == len(self._values):
+            capacity = 2 * size if self.max_size is None else min(2 * size, self.max_size)
+            self._moves = np.resize(self._moves, capacity)
+            self._values = np.resize(self._values, capacity)
+        return size
+
+    def items(self):
+        """ Returns the (key, (move index, value)) pairs, from the least to the most recently used. """
+        for key, slot in self._slots.items():
+            yield key, (int(self._moves[slot]), float(self._values[slot]))
+
+    def max_value(self) -> float:
+        """ Returns the largest value in the table. """
+        if self._max_slot is None:
+            return 0.0
+        if self._max_stale:
+            self._max_slot = int(np.argmax(self._values[:len(self._slots)]))
+            self._max_stale = False
+        return float(self._values[self._max_slot])
+
+    def merge(self, other: 'TranspositionTable') -> None:
+        """ Adds the entries of the other table that are not in this one. """
+        for key, (move_idx, value) in other.items():
+            if key not in self._slots:
+                self.put(key, move_idx, value)
+
+    def save(self, path: str) -> None:
+        """ Saves the table as compressed arrays of keys, move indices and values. """
+        keys = np.fromiter(self._slots.keys(), dtype=np.int64, count=len(self._slots))
+        slots = np.fromiter(self._slots.values(), dtype=np.int64, count=len(self._slots))
+        np.savez_compressed(path, keys=keys, moves=self._moves[slots], values=self._values[slots])
+
+    @classmethod
+    def load(cls, path: str, max_size: int | None = 1_000_000) -> 'TranspositionTable':
+        """ Loads a table saved with save, keeping the most recently used entries if it does not fit. """
+        table = cls(max_size)
+        with np.load(path) as data:
+            for key, move_idx, value in zip(data["keys"].tolist(), data["moves"].tolist(), data["values"].tolist()):
+                table.put(key, move_idx, value)
+        return table
@@ -1,19 +1,21 @@
-from copy import deepcopy
 import random
+from collections.abc import Sequence
 import numpy as np
-from game import Move, Game
+import instrumentation
+from game import Move, Game, MOVE_INDEX, BORDER_ROWS, BORDER_COLS, SLIDE_GATHER, SLIDE_DEST, LINES
 
 def verifie_move(from_pos: tuple[int, int], slide: Move, game: Game) -> bool:
     """ It checks if the move is valid, an invalid move is useless, so there is no point in computing it. """
     from_pos = (from_pos[1], from_pos[0])
     player_id = game.get_current_player()
+    board = game.get_board()
     
     acceptable_take: bool = (
         (from_pos[0] == 0 and from_pos[1] < 5)
         or (from_pos[0] == 4 and from_pos[1] < 5)
         or (from_pos[1] == 0 and from_pos[0] < 5)
         or (from_pos[1] == 4 and from_pos[0] < 5)
-    ) and (game.get_board()[from_pos] < 0 or game.get_board()[from_pos] == player_id)
+    ) and (board[from_pos] < 0 or board[from_pos] == player_id)
     
     if not acceptable_take:
         return False
@@ -47,39 +49,10 @@ def verifie_move(from_pos: tuple[int, int], slide: Move, game: Game) -> bool:
     return acceptable
 
 def simulate_move(from_pos: tuple[int, int], slide: Move, game: 'Game') -> np.ndarray | None:
-    """ It computes the next board after the action is taken. """
-    copy_game = deepcopy(game)
-    acceptable = verifie_move(from_pos, slide, copy_game)
-    
+    """ It computes the next board after the action is taken, the board is read-only. """
     # should not happen check move before entering here
-    if not acceptable:
-        return None
-    
-    from_pos = (from_pos[1], from_pos[0])
-    
-    copy_board = copy_game.get_board()
-    
-    piece = copy_game.get_current_player()
-    copy_board[from_pos] = piece
-    
-    if slide == Move.LEFT:
-        for i in range(from_pos[1], 0, -1):
-            copy_board[(from_pos[0], i)] = copy_board[(from_pos[0], i - 1)]
-        copy_board[(from_pos[0], 0)] = piece
-    elif slide == Move.RIGHT:
-        for i in range(from_pos[1], copy_board.shape[1] - 1, 1):
-            copy_board[(from_pos[0], i)] = copy_board[(from_pos[0], i + 1)]
-        copy_board[(from_pos[0], copy_board.shape[1] - 1)] = piece
-    elif slide == Move.TOP:
-        for i in range(from_pos[0], 0, -1):
-            copy_board[(i, from_pos[1])] = copy_board[(i - 1, from_pos[1])]
-        copy_board[(0, from_pos[1])] = piece
-    elif slide == Move.BOTTOM:
-        for i in range(from_pos[0], copy_board.shape[0] - 1, 1):
-            copy_board[(i, from_pos[1])] = copy_board[(i + 1, from_pos[1])]
-        copy_board[(copy_board.shape[0] - 1, from_pos[1])] = piece
-        
-    return copy_board
+    instrumentation.count("simulate_move")
+    return game.next_state((from_pos, slide))
 
 def fitness(from_pos: tuple[int, int], slide: Move, game: 'Game') -> int:
     """
@@ -87,6 +60,7 @@ def fitness(from_pos: tuple[int, int], slide: Move, game: 'Game') -> int:
         and then calculates the score for each row, column, and diagonal
         and then takes the maximum score
     """
+    instrumentation.count("fitness")
     copy_board = simulate_move(from_pos, slide, game)
     if copy_board is None:
         return -1
@@ -99,4 +73,43 @@ def fitness(from_pos: tuple[int, int], slide: Move, game: 'Game') -> int:
     count_diag_2 = np.max(np.sum(np.diag(np.fliplr(copy_board)) == piece))
     
     score = max(count_row, count_col, count_diag, count_diag_2)
-    return score
\ No newline at end of file
+    return score
+
+def move_indices(moves: Sequence[tuple[tuple[int, int], Move]], game: 'Game') -> np.ndarray:
+    """ It returns the index of each move in BORDER_MOVES, -1 for the moves the current player cannot play. """
+    indices = np.array([MOVE_INDEX.get((tuple(from_pos), slide), -1) for from_pos, slide in moves], dtype=np.intp)
+    pieces = game.get_board()[BORDER_ROWS[indices], BORDER_COLS[indices]]
+    playable = (indices >= 0) & ((pieces < 0) | (pieces == game.get_current_player()))
+    return np.where(playable, indices, -1)
+
+def simulate_moves(moves: Sequence[tuple[tuple[int, int], Move]], game: 'Game') -> tuple[np.ndarray, np.ndarray]:
+    """
+        It computes the next board for every move at once.
+        Returns the (N, 5, 5) boards and the mask of the acceptable moves,
+        the board of a move that is not acceptable is the current one.
+    """
+    indices = move_indices(moves, game)
+    acceptable = indices >= 0
+    board = game.get_board().ravel()
+    
+    boards = np.tile(board, (len(moves), 1))
+    boards[acceptable] = board[SLIDE_GATHER[indices[acceptable]]]
+    boards[np.flatnonzero(acceptable), SLIDE_DEST[indices[acceptable]]] = game.get_current_player()
+    return boards.reshape((len(moves), 5, 5)), acceptable
+
+def line_scores(boards: np.ndarray, piece: int) -> np.ndarray:
+    """ It counts the pieces of the player on every row, column and diagonal of (N, 5, 5) boards, returns (N, 12) counts. """
+    return np.sum(boards.reshape((len(boards), 25))[:, LINES] == piece, axis=2)
+
+def batch_fitness(moves: Sequence[tuple[tuple[int, int], Move]], game: 'Game') -> np.ndarray:
+    """
+        Vectorized version of fitness: it scores a whole population of moves in one pass.
+        A move that is not acceptable scores -1
+    """
+    instrumentation.count("batch_fitness")
+    instrumentation.count("batch_fitness_moves", len(moves))
+    if len(moves) == 0:
+        return np.zeros(0, dtype=np.intp)
+    boards, acceptable = simulate_moves(moves, game)
+    scores = np.max(line_scores(boards, game.get_current_player()), axis=1)
+    return np.where(acceptable, scores, -1)
@@ -0,0 +1,118 @@
+import numpy as np
+from game import BORDER_MOVES, BORDER_ROWS, BORDER_COLS, SLIDE_GATHER, SLIDE_DEST, LINES, Move
+
+# flat cell of the piece taken by each border move
+BORDER_CELLS = BORDER_ROWS * 5 + BORDER_COLS
+
+
+class VectorGame:
+    """
+        N Quixo games played in lockstep on an (N, 25) board array.
+        Actions are indices in BORDER_MOVES, every step plays one move in each game,
+        finished games are reset automatically. Player 0 moves first, as in Game.
+    """
+
+    def __init__(self, num_games: int, max_moves: int | None = 200) -> None:
+        self.num_games = num_games
+        self.max_moves = max_moves
+        self.boards = np.full((num_games, 25), -1, dtype=np.int16)
+        self.current_player = np.zeros(num_games, dtype=np.int16)
+        self.num_moves = np.zeros(num_games, dtype=np.int64)
+
+    def reset(self, games: np.ndarray | None = None) -> None:
+        """ Resets the selected games (a boolean mask), or all of them. """
+        if games is None:
+            games = np.ones(self.num_games, dtype=bool)
+        self.boards[games] = -1
+        self.current_player[games] = 0
+        self.num_moves[games] = 0
+
+    def legal_mask(self) -> np.ndarray:
+        """ Returns the (N, 44) mask of the moves each current player can play. """
+        pieces = self.boards[:, BORDER_CELLS]
+        return (pieces < 0) | (pieces == self.current_player[:, np.newaxis])
+
+    def next_boards(self) -> np.ndarray:
+        """ Returns the (N, 44, 25) boards after each of the 44 moves, played by the current players. """
+        boards = self.boards[:, SLIDE_GATHER]
+        boards[:, np.arange(len(BORDER_MOVES)), SLIDE_DEST] = self.current_player[:, np.newaxis]
+        return boards
+
+    def fitness(self) -> np.ndarray:
+        """
+            Returns the (N, 44) fitness of every move in every game, as utils.fitness:
+            the most pieces of the current player on a line after the move, -1 for moves that cannot be played.
+        """
+        mine = self.next_boards()[:, :, LINES] == self.current_player[:, np.newaxis, np.newaxis, np.newaxis]
+        scores = np.max(np.sum(mine, axis=3), axis=2)
+        return np.where(self.legal_mask(), scores, -1)
+
+    def winners(self, boards: np.ndarray, movers: np.ndarray) -> np.ndarray:
+        """
+            Returns the winner of each (25,) board, -1 if none.
+            If both players completed a line, the player that moved loses, as in Game.
+        """
+        cells = boards[:, LINES]
+        complete = np.all(cells == cells[:, :, :1], axis=2)
+        wins_0 = np.any(complete & (cells[:, :, 0] == 0), axis=1)
+        wins_1 = np.any(complete & (cells[:, :, 0] == 1), axis=1)
+        winners = np.where(wins_0, 0, np.where(wins_1, 1, -1))
+        return np.where(wins_0 & wins_1, 1 - movers, winners)
+
+    def step(self, actions: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+            Plays one move in every game.
+            Returns the winner of each game (-1 if none) and the mask of the games that ended,
+            either won or truncated after max_moves. The ended games are reset.
+        """
+        actions = np.asarray(actions)
+        games = np.arange(self.num_games)
+        if not np.all(self.legal_mask()[games, actions]):
+            raise ValueError("Some actions cannot be played")
+
+        boards = self.boards[games[:, np.newaxis], SLIDE_GATHER[actions]]
+        boards[games, SLIDE_DEST[actions]] = self.current_player
+        self.boards = boards
+        self.num_moves += 1
+
+        winners = self.winners(boards, self.current_player)
+        done = winners >= 0
+        if self.max_moves is not None:
+            done |= self.num_moves >= self.max_moves
+        self.current_player = 1 - self.current_player
+        self.reset(done)
+        return winners, done
+
+    def rollout(self, policies: tuple, num_steps: int) -> dict[str, np.ndarray]:
+        """
+            Plays num_steps steps, policies[p] chooses the actions of the games where player p moves.
+            A policy is a function VectorGame -> (N,) actions, like random_moves and greedy_moves.
+            Returns the (T, N) arrays of boards before each move, players, actions, winners and ended games.
+        """
+        history = {name: [] for name in ("boards", "players", "actions", "winners", "done")}
+        for _ in range(num_steps):
+            actions = np.where(self.current_player == 0, policies[0](self), policies[1](self))
+            history["boards"].append(self.boards)
+            history["players"].append(self.current_player)
+            history["actions"].append(actions)
+            winners, done = self.step(actions)
+            history["winners"].append(winners)
+            history["done"].append(done)
+        return {name: np.stack(values) for name, values in history.items()}
+
+
+def random_moves(games: VectorGame) -> np.ndarray:
+    """ Chooses a random legal move in every game. """
+    return np.argmax(np.random.random((games.num_games, len(BORDER_MOVES))) * games.legal_mask(), axis=1)
+
+
+def greedy_moves(games: VectorGame) -> np.ndarray:
+    """ Chooses the move with the best fitness in every game, ties are broken at random. """
+    scores = games.fitness()
+    best = scores == np.max(scores, axis=1, keepdims=True)
+    return np.argmax(np.random.random(scores.shape) * best, axis=1)
+
+
+def to_move(action: int) -> tuple[tuple[int, int], Move]:
+    """ Returns the (from_pos, slide) move of an action. """
+    return BORDER_MOVES[action]
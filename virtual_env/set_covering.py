@@ -0,0 +1,241 @@
+""" Set covering engine: the problem of the set-covering notebooks, with bitset states and an A* search.
+
+    Sets and coverages are bitsets stored in Python integers: bit j is set if element j is covered.
+    A state keeps its coverage, so a child covers `parent.covered | masks[i]` instead of OR-reducing
+    all the taken sets again, and goal_check/distance are popcounts.
+"""
+import heapq
+from collections import namedtuple
+from math import ceil
+
+import numpy as np
+
+from gx_utils import PriorityQueue
+
+# taken: bitset of the taken sets, covered: bitset of the covered elements
+State = namedtuple('State', ['taken', 'covered'])
+
+# children whose gains are computed by one product, bounds the (children, sets) matrix of child_heuristics
+CHILDREN_CHUNK = 256
+
+
+def to_bitset(array: np.ndarray) -> int:
+    """ Packs a boolean array in an integer, element j in bit j. """
+    return int.from_bytes(np.packbits(np.asarray(array, dtype=bool), bitorder="little").tobytes(), "little")
+
+
+def from_bitset(bitset: int, size: int) -> np.ndarray:
+    """ Unpacks the first size bits of an integer in a boolean array. """
+    packed = np.frombuffer(bitset.to_bytes((size + 7) // 8, "little"), dtype=np.uint8)
+    return np.unpackbits(packed, count=size, bitorder="little").astype(bool)
+
+
+def bits(bitset: int) -> list[int]:
+    """ Returns the indices of the bits set, in increasing order. """
+    return np.flatnonzero(from_bitset(bitset, bitset.bit_length())).tolist()
+
+
+class SetCovering:
+    """ A set covering instance: the sets are the rows of a (NUM_SETS, PROBLEM_SIZE) boolean matrix. """
+
+    def __init__(self, sets: np.ndarray) -> None:
+        self.sets = np.asarray(sets, dtype=bool)
+        self.num_sets, self.problem_size = self.sets.shape
+        self.masks = [to_bitset(s) for s in self.sets]
+        self.sizes = self.sets.sum(axis=1)
+        self.full_mask = (1 << self.problem_size) - 1
+        self.largest_set_size = int(self.sizes.max())
+        # the sets as numbers, for the gains products (exact: the counts are far below 2**24)
+        self.incidence = self.sets.astype(np.float32)
+        # indices of the sets covering each element
+        self.element_sets = [np.flatnonzero(column).tolist() for column in self.sets.T]
+
+    @classmethod
+    def random(cls, problem_size: int, num_sets: int, density: float, seed: int | None = None) -> 'SetCovering':
+        """ Random instance, every element belongs to every set with probability density. """
+        rng = np.random.default_rng(seed)
+        return cls(rng.random((num_sets, problem_size)) < density)
+
+    def initial_state(self) -> State:
+        """ Returns the state with no set taken. """
+        return State(0, 0)
+
+    def take(self, state: State, idx: int) -> State:
+        """ Returns the state with the set idx taken too, the coverage is updated incrementally. """
+        return State(state.taken | (1 << idx), state.covered | self.masks[idx])
+
+    def not_taken(self, state: State) -> list[int]:
+        """ Returns the indices of the sets not taken yet. """
+        return bits(~state.taken & ((1 << self.num_sets) - 1))
+
+    def covered(self, taken) -> int:
+        """ Returns the coverage of an iterable of set indices, computed from scratch. """
+        coverage = 0
+        for idx in taken:
+            coverage |= self.masks[idx]
+        return coverage
+
+    def state(self, taken) -> State:
+        """ Returns the state of an iterable of set indices. """
+        taken = list(taken)
+        return State(sum(1 << idx for idx in set(taken)), self.covered(taken))
+
+    def goal_check(self, state: State) -> bool:
+        """ True if every element is covered. """
+        return state.covered == self.full_mask
+
+    def distance(self, state: State) -> int:
+        """ Number of elements not covered yet. """
+        return self.problem_size - state.covered.bit_count()
+
+    def cost(self, state: State) -> int:
+        """ Number of sets taken. """
+        return state.taken.bit_count()
+
+    def is_solvable(self) -> bool:
+        """ True if taking all the sets covers every element. """
+        return self.covered(range(self.num_sets)) == self.full_mask
+
+    def taken_sets(self, state: State) -> list[int]:
+        """ Returns the indices of the sets taken. """
+        return bits(state.taken)
+
+    def first_uncovered(self, state: State) -> int:
+        """ Returns the smallest element not covered yet. """
+        uncovered = ~state.covered & self.full_mask
+        return (uncovered & -uncovered).bit_length() - 1
+
+    def children(self, state: State) -> list[State]:
+        """
+            Returns the children worth exploring: every cover contains a set covering the first uncovered element,
+            so only those sets are tried, the others would reach the same covers in a different order.
+        """
+        return [self.take(state, idx) for idx in self.element_sets[self.first_uncovered(state)]]
+
+    def h(self, state: State) -> int:
+        """
+            Optimistic number of sets still needed, as if every set covered largest_set_size new elements.
+            If no set can cover the missing elements, returns num_sets + 1, more than any cover.
+        """
+        missing_size = self.distance(state)
+        if missing_size == 0:
+            return 0
+        if self.largest_set_size == 0:
+            return self.num_sets + 1
+        return ceil(missing_size / self.largest_set_size)
+
+    def gains(self, state: State) -> np.ndarray:
+        """ Returns the number of elements not covered yet that every set would cover, one matrix-vector product. """
+        return self.incidence @ from_bitset(~state.covered & self.full_mask, self.problem_size).astype(np.float32)
+
+    def child_heuristics(self, state: State, children: list[State], h) -> list[int]:
+        """
+            Returns h of every child of state. For h2 and h3 the gains of all the children are computed from the
+            gains of state with one product per CHILDREN_CHUNK children: a child loses, for every set, the elements
+            of the taken set that were not covered yet, i.e. (taken sets x uncovered) @ (uncovered x sets).
+        """
+        if h != self.h2 and h != self.h3:
+            return [h(child) for child in children]
+        gains = self.gains(state)
+        incidence = self.incidence[:, np.flatnonzero(from_bitset(~state.covered & self.full_mask, self.problem_size))]
+        # the index of the set taken by every child
+        taken = [(child.taken ^ state.taken).bit_length() - 1 for child in children]
+        values = []
+        for start in range(0, len(children), CHILDREN_CHUNK):
+            newly_covered = incidence[taken[start:start + CHILDREN_CHUNK]]
+            child_gains = gains - newly_covered @ incidence.T
+            values.extend(h(child, g) for child, g in zip(children[start:start + CHILDREN_CHUNK], child_gains))
+        return values
+
+    def h2(self, state: State, gains: np.ndarray | None = None) -> int:
+        """ Like h, but with the largest number of elements not covered yet that a single set covers. """
+        missing_size = self.distance(state)
+        if missing_size == 0:
+            return 0
+        if gains is None:
+            gains = self.gains(state)
+        largest_gain = int(gains.max())
+        if largest_gain == 0:
+            return self.num_sets + 1
+        return ceil(missing_size / largest_gain)
+
+    def h3(self, state: State, gains: np.ndarray | None = None) -> int:
+        """
+            Smallest number of sets whose gains add up to the missing elements. Only the largest gains are sorted:
+            they are selected with np.partition, doubling how many until their sum reaches the missing elements.
+            Like h, returns num_sets + 1 if no set can cover the missing elements.
+        """
+        missing_size = self.distance(state)
+        if missing_size == 0:
+            return 0
+        if gains is None:
+            gains = self.gains(state)
+        largest_gain = int(gains.max())
+        if largest_gain == 0:
+            return self.num_sets + 1
+        taken = min(self.num_sets, ceil(missing_size / largest_gain))
+        while True:
+            largest = -np.sort(np.partition(-gains, taken - 1)[:taken])
+            cumulative = np.cumsum(largest)
+            if cumulative[-1] >= missing_size or taken == self.num_sets:
+                return int(np.searchsorted(cumulative, missing_size)) + 1
+            taken = min(self.num_sets, 2 * taken)
+
+
+def astar(problem: SetCovering, h=None) -> tuple[State, int]:
+    """
+        A* search of the cheapest cover, h is an admissible heuristic State -> int (problem.h by default).
+        States reaching a coverage already reached with the same number of sets or less are discarded.
+        Returns the goal state and the number of expanded states, raises ValueError if no cover exists.
+    """
+    if not problem.is_solvable():
+        raise ValueError("Problem not solvable")
+    h = h or problem.h
+    frontier = PriorityQueue()
+    state = problem.initial_state()
+    frontier.push(state, p=(h(state), 0))
+    # coverage -> number of sets of the cheapest state reaching it
+    visited = {state.covered: 0}
+
+    counter = 0
+    while frontier:
+        state = frontier.pop()
+        if problem.goal_check(state):
+            return state, counter
+        counter += 1
+        cost = problem.cost(state) + 1
+        # one child per coverage, the ones not reached yet with cost sets or less
+        children = {child.covered: child for child in problem.children(state) if visited.get(child.covered, cost + 1) > cost}
+        children = list(children.values())
+        for child, child_h in zip(children, problem.child_heuristics(state, children, h)):
+            visited[child.covered] = cost
+            frontier.push(child, p=(cost + child_h, child_h))
+    raise ValueError("Problem not solvable")
+
+
+def beam_search(problem: SetCovering, beam_width: int, h=None) -> tuple[State, int]:
+    """
+        Bounded-memory variant of astar: the states are expanded one level (number of sets) at a time
+        and only the beam_width children with the smallest f = g + h are kept.
+        The memory does not grow with the instance, but the cover found is not guaranteed to be the cheapest.
+        Returns the goal state and the number of expanded states, raises ValueError if no cover exists.
+    """
+    if not problem.is_solvable():
+        raise ValueError("Problem not solvable")
+    h = h or problem.h
+    level = [problem.initial_state()]
+    counter = 0
+    while level:
+        goals = [state for state in level if problem.goal_check(state)]
+        if goals:
+            return goals[0], counter
+        counter += len(level)
+        # coverage -> (h, child)
+        children = {}
+        for state in level:
+            new_children = list({child.covered: child for child in problem.children(state)
+                                 if child.covered not in children}.values())
+            for child, child_h in zip(new_children, problem.child_heuristics(state, new_children, h)):
+                children[child.covered] = child_h, child
+        level = [child for _, child in heapq.nsmallest(beam_width, children.values(), key=lambda scored: scored[0])]
+    raise ValueError("Problem not solvable")